@@ -1,98 +1,155 @@
 import csv
+import os
 import sys
+from array import array
+from contextlib import contextmanager, nullcontext
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from automata import binary
+from automata.metrics import phase, split_metrics_arguments, metrics_from_args, write_metrics
+from automata.cache import split_cache_arguments, cache_from_args, run_cached
 
 CSV_DELIMITER = ';'
 DEFAULT_STATE_PREFIX = 'S'
 MEALY_TO_MOORE_OPERATION = 'mealy-to-moore'
 MOORE_TO_MEALY_OPERATION = 'moore-to-mealy'
 ERROR_WRONG_OPERATION = "Неверное определение операции, используйте ""mealy-to-moore"" или ""moore-to-mealy"""
-ERROR_USAGE = "Используйте параметры: program.py <mode> <input_file> <output_file>"
+ERROR_USAGE = "Используйте параметры: program.py <mode> <input_file> <output_file> [--metrics FILE] [--profile [FILE]] [--trace-memory] [--no-cache] (\"-\" для stdin/stdout, .autb — двоичный формат)"
+ERROR_SAME_FILE = "Входной и выходной файлы должны различаться: moore-to-mealy пишет результат по мере чтения"
 STATE_NOT_FOUND = "NULL"
 STATE_INDEX_OFFSET = 1
+STDIO_PATH = '-'
+WRITE_BUFFER_SIZE = 1 << 20
+
+def open_input(path):
+    if path == STDIO_PATH:
+        return nullcontext(sys.stdin)
+    return open(path, newline='')
+
+def open_output(path):
+    if path == STDIO_PATH:
+        return nullcontext(sys.stdout)
+    return open(path, 'w', newline='', buffering=WRITE_BUFFER_SIZE)
+
+@contextmanager
+def open_reader(path):
+    # Двоичный файл узнаётся по сигнатуре, остальное читается как CSV
+    if binary.is_binary_file(path):
+        with binary.BinaryAutomaton(path) as automaton:
+            yield automaton.iter_rows()
+        return
+    with open_input(path) as csvfile:
+        yield csv.reader(csvfile, delimiter=CSV_DELIMITER)
+
+@contextmanager
+def open_writer(path):
+    if binary.is_binary_path(path):
+        with binary.RowsWriter(path) as writer:
+            yield writer
+        return
+    with open_output(path) as csvfile:
+        yield csv.writer(csvfile, delimiter=CSV_DELIMITER)
+
+def is_same_file(input_file, output_file):
+    if STDIO_PATH in (input_file, output_file) or not os.path.exists(output_file):
+        return False
+    return os.path.samefile(input_file, output_file)
+
+class MoveIds(dict):
+    """Номера ячеек вида "состояние/выход" в порядке первого появления"""
+
+    def __missing__(self, entry):
+        move_id = self[entry] = len(self)
+        return move_id
+
+def split_move(entry):
+    state, output_signal = entry.split('/')
+    return output_signal, state
+
+def convert_mealy_to_moore(input_file, output_file, metrics=None):
+    with phase(metrics, 'parse'), open_reader(input_file) as reader:
+        state_names = next(reader)[STATE_INDEX_OFFSET:]
+        state_columns = {}
+        for column, state in enumerate(state_names):
+            state_columns.setdefault(state, column)
 
-def are_moves_equal(move1, move2):
-    return move1[1] == move2[1] and move1[0] == move2[0]
-
-def find_move_index(moves_list, move):
-    for index in range(len(moves_list)):
-        if are_moves_equal(moves_list[index], move):
-            return index
-    return -1
-
-def convert_mealy_to_moore(input_file, output_file):
-    with open(input_file, newline='') as csvfile:
-        reader = csv.reader(csvfile, delimiter=CSV_DELIMITER)
-        header_states = next(reader)[STATE_INDEX_OFFSET:]
-        state_names = list(header_states)
-
-        transition_table = []
+        entry_ids = MoveIds()
         input_signals = []
-        state_transitions = []
+        transition_table = []
 
         for row in reader:
             input_signals.append(row[0])
-            current_row_transitions = []
-
-            for entry in row[STATE_INDEX_OFFSET:]:
-                state, output_signal = entry.split('/')
-                transition = (output_signal, state)
-                current_row_transitions.append(transition)
+            transition_table.append(array('i', map(entry_ids.__getitem__, row[STATE_INDEX_OFFSET:])))
 
-                if find_move_index(state_transitions, transition) == -1:
-                    state_transitions.append(transition)
+    with phase(metrics, 'conversion'):
+        # Пары (выход, состояние) в порядке первого появления
+        move_ids = {split_move(entry): move_id for entry, move_id in entry_ids.items()}
+        state_transitions = sorted(move_ids, key=lambda move: move[1])
 
-            transition_table.append(current_row_transitions)
+        if not state_transitions or state_transitions[0][1] != state_names[0]:
+            state_transitions.insert(0, (STATE_NOT_FOUND, state_names[0]))
 
-    state_transitions.sort(key=lambda move: move[1])
+        moore_names = [""] * len(move_ids)
+        for index, move in enumerate(state_transitions):
+            if move in move_ids:
+                moore_names[move_ids[move]] = f"{DEFAULT_STATE_PREFIX}{index}"
+        columns = [state_columns[move[1]] for move in state_transitions]
 
-    if state_transitions[0][1] != state_names[0]:
-        state_transitions.insert(0, (STATE_NOT_FOUND, state_names[0]))
-
-    with open(output_file, 'w', newline='') as csvfile:
-        writer = csv.writer(csvfile, delimiter=CSV_DELIMITER)
+    with phase(metrics, 'export'), open_writer(output_file) as writer:
         writer.writerow([""] + [move[0] for move in state_transitions])
         writer.writerow([""] + [f"{DEFAULT_STATE_PREFIX}{i}" for i in range(len(state_transitions))])
 
-        for i, input_signal in enumerate(input_signals):
-            row = [input_signal]
-            for move in state_transitions:
-                transition = transition_table[i][state_names.index(move[1])]
-                row.append(f"{DEFAULT_STATE_PREFIX}{find_move_index(state_transitions, transition)}")
-            writer.writerow(row)
+        for input_signal, row_transitions in zip(input_signals, transition_table):
+            writer.writerow([input_signal, *map(moore_names.__getitem__, map(row_transitions.__getitem__, columns))])
+
+    if metrics is not None:
+        metrics.count('mealy_states', len(state_names))
+        metrics.count('moore_states', len(state_transitions))
+        metrics.count('inputs', len(input_signals))
 
-def convert_moore_to_mealy(input_file, output_file):
-    with open(input_file, newline='') as csvfile:
-        reader = csv.reader(csvfile, delimiter=CSV_DELIMITER)
+def convert_moore_to_mealy(input_file, output_file, metrics=None):
+    # Каждая строка зависит только от двух строк заголовка, поэтому
+    # чтение и запись идут построчно и память не растёт с размером таблицы
+    rows = 0
+    with phase(metrics, 'conversion'), open_reader(input_file) as reader, open_writer(output_file) as writer:
         output_signals = next(reader)[STATE_INDEX_OFFSET:]
         state_names = next(reader)[STATE_INDEX_OFFSET:]
 
-        state_output_mapping = {state: output for state, output in zip(state_names, output_signals)}
+        mealy_moves = {state: f"{state}/{output}" for state, output in zip(state_names, output_signals)}
 
-        data_to_write = []
+        writer.writerow([""] + state_names)
         for row in reader:
-            output_row = [row[0]]
-            for state in row[STATE_INDEX_OFFSET:]:
-                output_row.append(f"{state}/{state_output_mapping[state]}")
-            data_to_write.append(output_row)
+            writer.writerow([row[0], *map(mealy_moves.__getitem__, row[STATE_INDEX_OFFSET:])])
+            rows += 1
 
-    with open(output_file, 'w', newline='') as csvfile:
-        writer = csv.writer(csvfile, delimiter=CSV_DELIMITER)
-        writer.writerow([""] + state_names)
-        writer.writerows(data_to_write)
+    if metrics is not None:
+        metrics.count('states', len(state_names))
+        metrics.count('inputs', rows)
 
-if __name__ == "__main__":
-    if len(sys.argv) != 4:
+def main():
+    metrics_args, args = split_metrics_arguments(sys.argv[1:])
+    cache_args, args = split_cache_arguments(args)
+    if len(args) != 3:
         print(ERROR_USAGE)
         sys.exit(1)
 
-    operation_mode = sys.argv[1]
-    input_file_path = sys.argv[2]
-    output_file_path = sys.argv[3]
+    operation_mode, input_file_path, output_file_path = args
+    metrics = metrics_from_args(metrics_args, f"MealyMoore {operation_mode}")
+    cache = cache_from_args(cache_args)
 
     if operation_mode == MEALY_TO_MOORE_OPERATION:
-        convert_mealy_to_moore(input_file_path, output_file_path)
+        run_cached(cache, lambda: convert_mealy_to_moore(input_file_path, output_file_path, metrics),
+                   operation_mode, input_file_path, output_file_path, metrics=metrics)
     elif operation_mode == MOORE_TO_MEALY_OPERATION:
-        convert_moore_to_mealy(input_file_path, output_file_path)
+        if is_same_file(input_file_path, output_file_path):
+            print(ERROR_SAME_FILE)
+            sys.exit(1)
+        run_cached(cache, lambda: convert_moore_to_mealy(input_file_path, output_file_path, metrics),
+                   operation_mode, input_file_path, output_file_path, metrics=metrics)
     else:
         print(ERROR_WRONG_OPERATION)
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
+    write_metrics(metrics, metrics_args)
+
+if __name__ == "__main__":
+    main()
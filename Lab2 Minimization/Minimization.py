@@ -1,5 +1,15 @@
 import csv
+import os
 import sys
+from collections import defaultdict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from automata import binary
+from automata.core import DFA, NO_STATE
+from automata.metrics import phase, split_metrics_arguments, metrics_from_args, write_metrics
+from automata.cache import split_cache_arguments, cache_from_args, run_cached
+
+DEFAULT_BACKEND = "hopcroft"
 
 def parse_list(file):
     elements = []
@@ -10,187 +20,240 @@ def parse_list(file):
     elements.append(line)
     return elements
 
-def write_state_headers(output_file, state_mapping):
-    index = 0
-    for _, value in state_mapping.items():
-        if int(value) >= index:
-            output_file.write(f";q{value}")
-            index += 1
-    output_file.write("\n")
-
-def update_state_mapping(previous_mapping, state_list, transition_table):
-    new_mapping = {}
-    index = 0
-    for i in range(len(transition_table)):
-        found = False
-        for j in range(i):
-            if transition_table[i] == transition_table[j] and previous_mapping[state_list[i]] == previous_mapping[state_list[j]]:
-                found = True
-                new_mapping[state_list[i]] = new_mapping[state_list[j]]
-                break
-        if not found:
-            new_mapping[state_list[i]] = str(index)
-            index += 1
-    return new_mapping
-
-def process_mealy(input_filename, output_filename):
+def read_dfa(input_filename, mealy):
+    """core.DFA из CSV или двоичного файла"""
+    if binary.is_binary_file(input_filename):
+        with binary.BinaryAutomaton(input_filename) as automaton:
+            dfa = DFA.from_binary(automaton)
+        if dfa.is_mealy != mealy:
+            raise ValueError(f"{input_filename} is not a {'Mealy' if mealy else 'Moore'} table")
+        return dfa
     with open(input_filename, newline='') as input_file:
-        reader = csv.reader(input_file, delimiter=';')
+        if mealy:
+            return DFA.from_mealy(parse_list(input_file), csv.reader(input_file, delimiter=';'))
+        output_symbols = parse_list(input_file)
         state_list = parse_list(input_file)
-        num_states = len(state_list)
-        original_table = [[] for _ in range(num_states)]
-        temp_table = [[] for _ in range(num_states)]
-        input_symbols = []
-
-        for row in reader:
-            input_symbols.append(row[0])
-            for col_idx, move in enumerate(row[1:]):
-                if '/' in move:
-                    next_state, output_symbol = move.split('/')
-                else:
-                    next_state, output_symbol = move, ''
-                original_table[col_idx].append((next_state, output_symbol))
-                temp_table[col_idx].append(next_state)
-
-        state_mapping = initialize_state_mapping(state_list, original_table, input_symbols)
-        state_mapping = minimize_states(state_mapping, state_list, original_table, temp_table)
-
-        write_mealy_output(output_filename, input_symbols, state_list, original_table, temp_table, state_mapping)
-
-def initialize_state_mapping(state_list, original_table, input_symbols):
-    state_mapping = {}
-    index = 0
-    for i in range(len(state_list)):
-        found = False
-        for j in range(i):
-            if all(original_table[i][k][1] == original_table[j][k][1] for k in range(len(input_symbols))):
-                found = True
-                state_mapping[state_list[i]] = state_mapping[state_list[j]]
-                break
-        if not found:
-            state_mapping[state_list[i]] = str(index)
-            index += 1
-    return state_mapping
-
-def minimize_states(state_mapping, state_list, original_table, temp_table):
-    changes = True
-    while changes:
-        changes = False
-        for i in range(len(original_table)):
-            for j in range(len(original_table[i])):
-                if original_table[i][j][0] in state_mapping:
-                    temp_table[i][j] = state_mapping[original_table[i][j][0]]
-                else:
-                    temp_table[i][j] = original_table[i][j][0]
+        return DFA.from_moore(state_list, output_symbols, csv.reader(input_file, delimiter=';'))
 
-        new_mapping = update_state_mapping(state_mapping, state_list, temp_table)
-        if state_mapping != new_mapping:
-            changes = True
-            state_mapping = new_mapping.copy()
-    return state_mapping
-
-def write_mealy_output(output_filename, input_symbols, state_list, original_table, temp_table, state_mapping):
+def write_rows(output_filename, rows):
+    if binary.is_binary_path(output_filename):
+        binary.write_rows(output_filename, rows)
+        return
     with open(output_filename, 'w', newline='') as output_file:
-        write_state_headers(output_file, state_mapping)
-        for i in range(len(input_symbols)):
-            output_file.write(input_symbols[i])
-            index = 0
-            for key, value in state_mapping.items():
-                if int(value) >= index:
-                    next_state = temp_table[state_list.index(key)][i]
-                    output_symbol = original_table[state_list.index(key)][i][1]
-                    output_file.write(f";q{next_state}/{output_symbol}")
-                    index += 1
-            output_file.write("\n")
-
-def process_moore(input_filename, output_filename):
-    with open(input_filename, newline='') as input_file:
-        reader = csv.reader(input_file, delimiter=';')
-        output_symbols = parse_list(input_file)
-        state_list = parse_list(input_file)
-        num_states = len(state_list)
-        original_table = [[] for _ in range(num_states)]
-        input_symbols = []
-
-        for row in reader:
-            input_symbols.append(row[0])
-            for col_idx, value in enumerate(row[1:]):
-                original_table[col_idx].append(value)
-
-        temp_table = [row[:] for row in original_table]
-        state_mapping = initialize_state_mapping_moore(state_list, output_symbols)
-        state_mapping = minimize_states(state_mapping, state_list, original_table, temp_table)
-        state_mapping = minimize_states_moore(state_mapping, state_list, original_table, temp_table)
-
-        write_moore_output(output_filename, input_symbols, state_list, output_symbols, temp_table, state_mapping)
-
-def initialize_state_mapping_moore(state_list, output_symbols):
-    state_mapping = {}
-    index = 0
-    for i in range(len(state_list)):
-        found = False
-        for j in range(i):
-            if output_symbols[i] == output_symbols[j]:
-                found = True
-                state_mapping[state_list[i]] = state_mapping[state_list[j]]
-                break
-        if not found:
-            state_mapping[state_list[i]] = str(index)
-            index += 1
-    return state_mapping
-
-def minimize_states_moore(state_mapping, state_list, original_table, temp_table):
-    changes = True
-    while changes:
-        changes = False
-        for i in range(len(original_table)):
-            for j in range(len(original_table[i])):
-                if original_table[i][j] in state_mapping:
-                    temp_table[i][j] = state_mapping[original_table[i][j]]
+        for row in rows:
+            output_file.write(';'.join(row) + "\n")
+
+def process_mealy(input_filename, output_filename, backend=DEFAULT_BACKEND, metrics=None):
+    process_dfa(input_filename, output_filename, True, backend, metrics)
+
+def process_moore(input_filename, output_filename, backend=DEFAULT_BACKEND, metrics=None):
+    process_dfa(input_filename, output_filename, False, backend, metrics)
+
+# Минимизация Хопкрофта: O(n·k·log n) вместо пересборки таблицы на каждом раунде.
+def hopcroft_refine(targets, initial_classes, num_symbols, metrics=None):
+    inverse = [defaultdict(list) for _ in range(num_symbols)]
+    for source, row in enumerate(targets):
+        for symbol, target in enumerate(row):
+            inverse[symbol][target].append(source)
+
+    block_of = [0] * len(initial_classes)
+    blocks = []
+    block_ids = {}
+    for state, initial_class in enumerate(initial_classes):
+        block = block_ids.get(initial_class)
+        if block is None:
+            block = block_ids[initial_class] = len(blocks)
+            blocks.append(set())
+        blocks[block].add(state)
+        block_of[state] = block
+
+    largest = max(range(len(blocks)), key=lambda block: len(blocks[block]), default=0)
+    worklist = [(block, symbol) for block in range(len(blocks)) if block != largest
+                for symbol in range(num_symbols)]
+    pending = set(worklist)
+    rounds = splits = 0
+
+    while worklist:
+        rounds += 1
+        splitter = worklist.pop()
+        pending.discard(splitter)
+        splitter_block, symbol = splitter
+
+        touched = defaultdict(list)
+        predecessors = inverse[symbol]
+        for target in blocks[splitter_block]:
+            for source in predecessors.get(target, ()):
+                touched[block_of[source]].append(source)
+
+        for block, members in touched.items():
+            if len(members) == len(blocks[block]):
+                continue
+            splits += 1
+            new_block = len(blocks)
+            part = set(members)
+            blocks[block] -= part
+            blocks.append(part)
+            for state in members:
+                block_of[state] = new_block
+            smaller = new_block if len(part) <= len(blocks[block]) else block
+            for split_symbol in range(num_symbols):
+                if (block, split_symbol) in pending:
+                    added = (new_block, split_symbol)
                 else:
-                    temp_table[i][j] = original_table[i][j]
+                    added = (smaller, split_symbol)
+                pending.add(added)
+                worklist.append(added)
+    if metrics is not None:
+        metrics.count('refinement_rounds', rounds)
+        metrics.count('splits', splits)
+    return block_of
 
-        new_mapping = update_state_mapping(state_mapping, state_list, temp_table)
-        if state_mapping != new_mapping:
-            changes = True
-            state_mapping = new_mapping.copy()
-    return state_mapping
+# Векторизованное уточнение сигнатур: таблица переходов хранится как ndarray
+# (состояния × входы), каждый раунд — одна сборка классов преемников и np.unique.
+def numpy_refine(targets, initial_classes, num_symbols, metrics=None):
+    import numpy as np
 
-def write_moore_output(output_filename, input_symbols, state_list, output_symbols, temp_table, state_mapping):
-    with open(output_filename, 'w', newline='') as output_file:
-        index = 0
-        for key, value in state_mapping.items():
-            if int(value) >= index:
-                output_file.write(f";{output_symbols[state_list.index(key)]}")
-                index += 1
-        output_file.write("\n")
-
-        write_state_headers(output_file, state_mapping)
-        for i in range(len(input_symbols)):
-            output_file.write(input_symbols[i])
-            index = 0
-            for key, value in state_mapping.items():
-                if int(value) >= index:
-                    output_file.write(f";q{temp_table[state_list.index(key)][i]}")
-                    index += 1
-            output_file.write("\n")
+    num_states = len(initial_classes)
+    table = np.empty((num_states, num_symbols), dtype=np.int64)
+    if targets:
+        table[:len(targets)] = np.asarray(targets, dtype=np.int64).reshape(len(targets), num_symbols)
+    # Виртуальные состояния ссылаются сами на себя и не отделяются от своего класса
+    table[len(targets):] = np.arange(len(targets), num_states, dtype=np.int64)[:, None]
 
-def main():
-    if len(sys.argv) < 4:
-        print("Usage: <program> <mode(mealy/moore)> <input.csv> <output.csv>")
-        return 1
+    class_ids = {}
+    classes = np.fromiter((class_ids.setdefault(c, len(class_ids)) for c in initial_classes),
+                          dtype=np.int64, count=num_states)
+    num_classes = initial_count = len(class_ids)
+    rounds = 0
+    while True:
+        rounds += 1
+        signature = np.column_stack((classes, classes[table]))
+        _, inverse = np.unique(signature, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        new_count = int(inverse.max()) + 1 if num_states else 0
+        if new_count == num_classes:
+            if metrics is not None:
+                metrics.count('refinement_rounds', rounds)
+                metrics.count('splits', num_classes - initial_count)
+            return classes.tolist()
+        classes, num_classes = inverse, new_count
 
-    mode = sys.argv[2]
-    input_filename = sys.argv[3]
-    output_filename = sys.argv[4]
+# Входы с одинаковыми столбцами переходов уточняют разбиение одинаково (выходы Мили
+# уже учтены в начальном разбиении), поэтому уточнение идёт по одному входу из класса
+def compress_inputs(targets, num_symbols):
+    columns = set()
+    kept = []
+    for symbol in range(num_symbols):
+        column = tuple(row[symbol] for row in targets)
+        if column not in columns:
+            columns.add(column)
+            kept.append(symbol)
+    if len(kept) == num_symbols:
+        return targets, num_symbols
+    return [[row[symbol] for symbol in kept] for row in targets], len(kept)
 
-    if mode == "mealy":
-        process_mealy(input_filename, output_filename)
-    elif mode == "moore":
-        process_moore(input_filename, output_filename)
+REFINE_BACKENDS = {
+    "hopcroft": hopcroft_refine,
+    "numpy": numpy_refine,
+}
+
+# Минимизация над core.DFA: цели уже пронумерованы, поэтому таблица для
+# уточнения строится без словарей имён. Цели без столбца и пустые ячейки —
+# виртуальные состояния в собственных классах: такие переходы сравниваются по имени.
+def minimize_dfa(dfa, backend=DEFAULT_BACKEND, metrics=None):
+    """Номера классов эквивалентности состояний в порядке первого появления"""
+    refine = REFINE_BACKENDS[backend]
+    width = dfa.num_states
+    if not width:
+        return []
+    sink = len(dfa.state_names)
+    targets = [[sink if target == NO_STATE else target for target in dfa.row(state)] for state in range(width)]
+    if dfa.is_mealy:
+        outputs = dfa.transition_outputs
+        initial_classes = [tuple(outputs[state::width]) for state in range(width)]
     else:
+        initial_classes = list(dfa.outputs)
+    initial_classes += [('virtual', index) for index in range(width, sink + 1)]
+    targets, num_symbols = compress_inputs(targets, dfa.num_inputs)
+    block_of = refine(targets, initial_classes, num_symbols, metrics)
+    numbering = {}
+    return [numbering.setdefault(block_of[state], len(numbering)) for state in range(width)]
+
+def process_dfa(input_filename, output_filename, mealy, backend=DEFAULT_BACKEND, metrics=None):
+    with phase(metrics, 'parse'):
+        dfa = read_dfa(input_filename, mealy)
+    with phase(metrics, 'refinement'):
+        classes = minimize_dfa(dfa, backend, metrics)
+    with phase(metrics, 'export'):
+        write_dfa_output(output_filename, dfa, classes)
+    if metrics is not None:
+        metrics.count('states', dfa.num_states)
+        metrics.count('inputs', dfa.num_inputs)
+        metrics.count('classes', max(classes, default=-1) + 1)
+
+def write_dfa_output(output_filename, dfa, classes):
+    """Пишет минимальный автомат: по столбцу на класс, классы в порядке первого появления"""
+    width = dfa.num_states
+    names = dfa.state_names
+    representatives = []
+    for state, class_id in enumerate(classes):
+        if class_id == len(representatives):
+            representatives.append(state)
+
+    def class_name(target):
+        if target == NO_STATE:
+            return "q"
+        return f"q{classes[target] if target < width else names[target]}"
+
+    rows = []
+    if not dfa.is_mealy:
+        rows.append([""] + [dfa.state_output(position) for position in representatives])
+    rows.append([""] + [f"q{class_id}" for class_id in range(len(representatives))])
+    table = dfa.table
+    for i, symbol in enumerate(dfa.input_names):
+        base = i * width
+        if dfa.is_mealy:
+            output_names = dfa.output_names
+            outputs = dfa.transition_outputs
+            rows.append([symbol] + [f"{class_name(table[base + position])}/{output_names[outputs[base + position]]}"
+                                    for position in representatives])
+        else:
+            rows.append([symbol] + [class_name(table[base + position]) for position in representatives])
+    write_rows(output_filename, rows)
+
+def main():
+    metrics_args, args = split_metrics_arguments(sys.argv[1:])
+    cache_args, args = split_cache_arguments(args)
+    backend = DEFAULT_BACKEND
+    if "--backend" in args:
+        position = args.index("--backend")
+        backend = args[position + 1] if position + 1 < len(args) else ""
+        del args[position:position + 2]
+
+    if len(args) < 3:
+        print("Usage: <program> <mode(mealy/moore)> <input.csv|.autb> <output.csv|.autb> [--backend hopcroft|numpy] [--metrics FILE] [--profile [FILE]] [--trace-memory] [--no-cache]")
+        return 1
+    if backend not in REFINE_BACKENDS:
+        print("Wrong backend, use: " + ", ".join(REFINE_BACKENDS))
+        return 1
+
+    mode, input_filename, output_filename = args[-3:]
+    if mode not in ("mealy", "moore"):
         print("Wrong mode")
         return 1
+    metrics = metrics_from_args(metrics_args, f"Minimization {mode}")
+    cache = cache_from_args(cache_args)
+
+    try:
+        run_cached(cache, lambda: process_dfa(input_filename, output_filename, mode == "mealy", backend, metrics),
+                   f"minimize-{mode}", input_filename, output_filename, metrics=metrics)
+    except ImportError as error:
+        print(f"Backend {backend} is unavailable: {error}")
+        return 1
+    except ValueError as error:
+        print(error)
+        return 1
+    write_metrics(metrics, metrics_args)
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,36 @@
+"""Сжатие алфавита: символы с одинаковыми столбцами переходов объединяются в классы"""
+
+
+def symbol_classes(size, column):
+    """Разбивает номера символов 0..size-1 на классы с равными столбцами.
+
+    column(i) — хешируемое описание переходов по i-му символу во всех
+    состояниях. Классы упорядочены по первому символу, а символы внутри
+    класса — по возрастанию, поэтому обход классов открывает новые
+    состояния в том же порядке, что и обход всего алфавита.
+    Возвращает список классов и номер класса для каждого символа.
+    """
+    class_ids = {}
+    classes = []
+    class_of = []
+    for index in range(size):
+        key = column(index)
+        class_id = class_ids.get(key)
+        if class_id is None:
+            class_id = class_ids[key] = len(classes)
+            classes.append([])
+        classes[class_id].append(index)
+        class_of.append(class_id)
+    return classes, class_of
+
+
+def compress_rows(rows, classes):
+    """Оставляет в каждой строке таблицы по одному столбцу на класс"""
+    representatives = [members[0] for members in classes]
+    return [[row[index] for index in representatives] for row in rows]
+
+
+def compress_table(rows, size):
+    """Классы символов для таблицы rows[state][symbol] и сжатая таблица"""
+    classes, class_of = symbol_classes(size, lambda index: tuple(row[index] for row in rows))
+    return classes, class_of, compress_rows(rows, classes)
@@ -0,0 +1,77 @@
+import sys
+import time
+
+# Примерная цена состояния ДКА сверх самого подмножества: запись в словаре,
+# имя и строка переходов
+STATE_OVERHEAD_BYTES = 256
+
+
+class BudgetExceeded(Exception):
+    """Построение ДКА остановлено: превышен лимит состояний, памяти или времени"""
+
+    def __init__(self, reason, states, frontier, largest_subset, used_bytes, elapsed):
+        self.reason = reason
+        self.states = states
+        self.frontier = frontier
+        self.largest_subset = largest_subset
+        self.used_bytes = used_bytes
+        self.elapsed = elapsed
+        super().__init__(self.report())
+
+    def report(self):
+        return (f"Determinization stopped: {self.reason}\n"
+                f"  DFA states built: {self.states}\n"
+                f"  frontier size: {self.frontier}\n"
+                f"  largest subset: {self.largest_subset} NFA states\n"
+                f"  estimated memory: {self.used_bytes} bytes\n"
+                f"  elapsed: {self.elapsed:.2f} s")
+
+
+class Budget:
+    """Лимиты на число состояний ДКА, оценку занятой памяти и время работы.
+
+    Построитель сообщает о каждом новом состоянии через add_state и
+    вызывает check на каждой итерации цикла; None означает «без лимита».
+    """
+
+    def __init__(self, max_states=None, max_bytes=None, max_time=None):
+        self.max_states = max_states
+        self.max_bytes = max_bytes
+        self.max_time = max_time
+        self.start()
+
+    def start(self):
+        self.started = time.monotonic()
+        self.states = 0
+        self.used_bytes = 0
+        self.largest_subset = 0
+
+    def add_state(self, subset, subset_size):
+        self.states += 1
+        self.used_bytes += sys.getsizeof(subset) + STATE_OVERHEAD_BYTES
+        if subset_size > self.largest_subset:
+            self.largest_subset = subset_size
+
+    def check(self, frontier):
+        elapsed = time.monotonic() - self.started
+        if self.max_states is not None and self.states > self.max_states:
+            reason = f"more than {self.max_states} DFA states"
+        elif self.max_bytes is not None and self.used_bytes > self.max_bytes:
+            reason = f"more than {self.max_bytes} bytes"
+        elif self.max_time is not None and elapsed > self.max_time:
+            reason = f"more than {self.max_time} s"
+        else:
+            return
+        raise BudgetExceeded(reason, self.states, frontier, self.largest_subset, self.used_bytes, elapsed)
+
+
+def add_budget_arguments(parser):
+    parser.add_argument('--max-states', type=int, help="лимит числа состояний ДКА")
+    parser.add_argument('--max-bytes', type=int, help="лимит оценки памяти под подмножества, байт")
+    parser.add_argument('--max-time', type=float, help="лимит времени построения, секунд")
+
+
+def budget_from_args(args):
+    if args.max_states is None and args.max_bytes is None and args.max_time is None:
+        return None
+    return Budget(args.max_states, args.max_bytes, args.max_time)
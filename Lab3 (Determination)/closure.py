@@ -0,0 +1,88 @@
+"""Предварительный расчёт ε-замыканий через конденсацию компонент сильной связности"""
+
+
+def strongly_connected_components(successors):
+    """Итеративный алгоритм Тарьяна.
+
+    successors[v] — номера состояний, достижимых из v по одному ε-переходу.
+    Компоненты возвращаются в обратном топологическом порядке: каждая
+    компонента идёт после всех компонент, достижимых из неё.
+    """
+    count = len(successors)
+    index = [-1] * count
+    low = [0] * count
+    on_stack = [False] * count
+    stack = []
+    components = []
+    counter = 0
+
+    for root in range(count):
+        if index[root] != -1:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, iter(successors[root]))]
+
+        while work:
+            state, targets = work[-1]
+            for target in targets:
+                if index[target] == -1:
+                    index[target] = low[target] = counter
+                    counter += 1
+                    stack.append(target)
+                    on_stack[target] = True
+                    work.append((target, iter(successors[target])))
+                    break
+                if on_stack[target] and index[target] < low[state]:
+                    low[state] = index[target]
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    if low[state] < low[parent]:
+                        low[parent] = low[state]
+                if low[state] == index[state]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if member == state:
+                            break
+                    components.append(component)
+    return components
+
+
+def epsilon_closures(successors):
+    """Возвращает ε-замыкание каждого состояния в виде битовой маски.
+
+    Состояния одной компоненты сильной связности имеют общее замыкание,
+    поэтому оно считается один раз на компоненту в обратном топологическом
+    порядке и собирается из уже готовых замыканий компонент-преемников.
+    Глубина ε-цепочек не ограничена стеком вызовов.
+    """
+    component_of = [-1] * len(successors)
+    closures = [0] * len(successors)
+
+    for component_id, component in enumerate(strongly_connected_components(successors)):
+        closure = 0
+        for state in component:
+            component_of[state] = component_id
+            closure |= 1 << state
+        for state in component:
+            for target in successors[state]:
+                if component_of[target] != component_id:
+                    closure |= closures[target]
+        for state in component:
+            closures[state] = closure
+    return closures
+
+
+def mask_to_states(mask):
+    """Перебирает номера состояний, входящих в маску"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
@@ -1,6 +1,16 @@
+import os
 import sys
 import csv
-from collections import defaultdict
+import argparse
+from array import array
+from collections import defaultdict, deque
+
+from alphabet import symbol_classes
+from budget import BudgetExceeded, add_budget_arguments, budget_from_args
+from closure import epsilon_closures, mask_to_states
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from automata.metrics import NORMAL, phase, verbose, add_metrics_arguments, metrics_from_args, write_metrics
 
 
 def read_nfa(file_path):
@@ -47,46 +57,114 @@ def read_nfa(file_path):
     return nfa
 
 
-def epsilon_closure(nfa, states):
-    """Вычисление ε-замыкания как в JS"""
-    closure = set(states)
-    stack = list(closure)
+def epsilon_closure_table(nfa):
+    """ε-замыкания всех состояний в виде битовых масок, считаются один раз"""
+    edges = nfa['edges']
+    size = nfa['states']
+    for symbols in edges.values():
+        for targets in symbols.values():
+            size = max(size, max(targets, default=-1) + 1)
+    size = max(size, max(edges, default=-1) + 1)
 
-    while stack:
-        s = stack.pop()
-        for t in nfa['edges'][s].get('ε', set()):
-            if t not in closure:
-                closure.add(t)
-                stack.append(t)
-    return frozenset(closure)
+    successors = []
+    for s in range(size):
+        symbols = edges.get(s)
+        successors.append(list(symbols.get('ε', ())) if symbols else [])
+    return epsilon_closures(successors)
 
 
-def subset_construction(nfa):
-    """Точный порт JS subsetConstruction"""
-    dfa = {
-        'alphabet': sorted(nfa['alphabet']),
-        'states': 0,
-        'edges': defaultdict(lambda: defaultdict(set)),
-        'accepting': set(),
-        'statescor': {}
-    }
+def epsilon_closure(nfa, states):
+    """Вычисление ε-замыкания по заранее посчитанной таблице"""
+    closures = nfa.get('closures')
+    if closures is None:
+        closures = nfa['closures'] = epsilon_closure_table(nfa)
+
+    mask = 0
+    for s in states:
+        mask |= closures[s]
+    return frozenset(mask_to_states(mask))
+
+
+NO_STATE = -1
+
+
+class CompactDFA:
+    """ДКА в виде таблицы целых номеров над классами символов.
+
+    classes — номера символов alphabet, неразличимых во всех состояниях НКА;
+    table[state][c] — переход по любому символу класса c или NO_STATE.
+    """
+
+    __slots__ = ('alphabet', 'classes', 'class_of', 'start', 'accepting', 'table', 'subsets')
+
+    def __init__(self, alphabet, classes, class_of):
+        self.alphabet = alphabet
+        self.classes = classes
+        self.class_of = class_of
+        self.start = 0
+        self.accepting = set()
+        self.table = []
+        self.subsets = []
+
+    @property
+    def states(self):
+        return len(self.table)
+
+    def add_state(self, subset):
+        self.subsets.append(subset)
+        self.table.append(array('i', [NO_STATE]) * len(self.classes))
+        return len(self.table) - 1
+
+    def transition(self, state, symbol_index):
+        return self.table[state][self.class_of[symbol_index]]
+
+
+def symbol_column(edges, symbol):
+    """Переходы всех состояний НКА по символу — ключ для сжатия алфавита"""
+    return tuple((s, frozenset(symbols[symbol])) for s, symbols in edges if symbols.get(symbol))
+
+
+def determinize(nfa, budget=None, metrics=None):
+    """Построение подмножеств: поиск существующего состояния по словарю, очередь — deque"""
+    alphabet = sorted(nfa['alphabet'])
+    edges = sorted(nfa['edges'].items())
+    classes, class_of = symbol_classes(len(alphabet), lambda index: symbol_column(edges, alphabet[index]))
+    dfa = CompactDFA(alphabet, classes, class_of)
+    class_symbols = [alphabet[members[0]] for members in classes]
+
+    # Первый вызов строит таблицу ε-замыканий всех состояний
+    with phase(metrics, 'closure'):
+        initial = epsilon_closure(nfa, {0})
+    with phase(metrics, 'construction'):
+        closure_calls = explore_subsets(nfa, dfa, class_symbols, initial, budget)
+    if metrics is not None:
+        metrics.count('nfa_states', nfa['states'])
+        metrics.count('closure_calls', closure_calls + 1)
+        metrics.count('symbol_classes', len(classes))
+        metrics.count('subset_states', dfa.states)
+    return dfa
+
 
-    # Начальное состояние
-    initial = epsilon_closure(nfa, {0})
-    dfa['statescor'][0] = initial
-    dfa['states'] = 1
-    queue = [0]
+def explore_subsets(nfa, dfa, class_symbols, initial, budget=None):
+    """Обход подмножеств из initial; возвращает число вычисленных ε-замыканий"""
+    closure_calls = 0
+    state_ids = {initial: dfa.add_state(initial)}
+    queue = deque([0])
+    if budget is not None:
+        budget.start()
+        budget.add_state(initial, len(initial))
 
     while queue:
-        current = queue.pop(0)
-        current_states = dfa['statescor'][current]
+        if budget is not None:
+            budget.check(len(queue))
+        current = queue.popleft()
+        current_states = dfa.subsets[current]
+        row = dfa.table[current]
 
-        # Проверка на финальное состояние
         if any(s in nfa['accepting'] for s in current_states):
-            dfa['accepting'].add(current)
+            dfa.accepting.add(current)
 
-        # Обработка символов
-        for symbol in dfa['alphabet']:
+        for class_index, symbol in enumerate(class_symbols):
             reachable = set()
             for s in current_states:
                 reachable.update(nfa['edges'][s].get(symbol, set()))
@@ -95,22 +173,35 @@ def subset_construction(nfa):
                 continue
 
             closure = epsilon_closure(nfa, reachable)
+            closure_calls += 1
 
-            # Поиск существующего состояния
-            found = None
-            for state in dfa['statescor']:
-                if dfa['statescor'][state] == closure:
-                    found = state
-                    break
-
-            if found is None:
-                new_state = dfa['states']
-                dfa['statescor'][new_state] = closure
-                dfa['edges'][current][symbol].add(new_state)
-                dfa['states'] += 1
-                queue.append(new_state)
-            else:
-                dfa['edges'][current][symbol].add(found)
+            target = state_ids.get(closure)
+            if target is None:
+                target = state_ids[closure] = dfa.add_state(closure)
+                queue.append(target)
+                if budget is not None:
+                    budget.add_state(closure, len(closure))
+            row[class_index] = target
+
+    return closure_calls
+
+
+def subset_construction(nfa, budget=None, metrics=None):
+    """Точный порт JS subsetConstruction"""
+    compact = determinize(nfa, budget, metrics)
+    dfa = {
+        'alphabet': compact.alphabet,
+        'states': compact.states,
+        'edges': defaultdict(lambda: defaultdict(set)),
+        'accepting': compact.accepting,
+        'statescor': dict(enumerate(compact.subsets))
+    }
+
+    for state, row in enumerate(compact.table):
+        for members, target in zip(compact.classes, row):
+            if target != NO_STATE:
+                for index in members:
+                    dfa['edges'][state][compact.alphabet[index]].add(target)
 
     return dfa
 
@@ -118,10 +209,11 @@ def subset_construction(nfa):
 def export_dfa(dfa, output_file):
     """Экспорт с точным соответствием JS"""
     # Соответствие состояний
-    print("States mapping:")
-    for state in sorted(dfa['statescor']):
-        orig_states = sorted(f'X{s}' for s in dfa['statescor'][state])
-        print(f"S{state} -> {','.join(orig_states)}")
+    if verbose(NORMAL):
+        print("States mapping:")
+        for state in sorted(dfa['statescor']):
+            orig_states = sorted(f'X{s}' for s in dfa['statescor'][state])
+            print(f"S{state} -> {','.join(orig_states)}")
 
     # Подготовка CSV
     symbols = sorted(dfa['alphabet'])
@@ -145,11 +237,26 @@ def export_dfa(dfa, output_file):
             writer.writerow(row)
 
 
-if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: ./lab4 input.csv output.csv")
+def main():
+    parser = argparse.ArgumentParser(usage="./lab4 input.csv output.csv [--max-states N] ...")
+    parser.add_argument('input')
+    parser.add_argument('output')
+    add_budget_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    metrics = metrics_from_args(args, 'd1')
+
+    with phase(metrics, 'parse'):
+        nfa = read_nfa(args.input)
+    try:
+        dfa = subset_construction(nfa, budget_from_args(args), metrics)
+    except BudgetExceeded as error:
+        print(error.report(), file=sys.stderr)
         sys.exit(1)
+    with phase(metrics, 'export'):
+        export_dfa(dfa, args.output)
+    write_metrics(metrics, args)
 
-    nfa = read_nfa(sys.argv[1])
-    dfa = subset_construction(nfa)
-    export_dfa(dfa, sys.argv[2])
\ No newline at end of file
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,15 @@
 import re
 from collections import defaultdict
 import csv
+import os
 import sys
+import argparse
+
+from budget import BudgetExceeded, add_budget_arguments, budget_from_args
+from closure import epsilon_closures, mask_to_states
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from automata.metrics import NORMAL, DEBUG, echo, phase, add_metrics_arguments, metrics_from_args, write_metrics
 
 def read_moore_to_list(positions, file, alphabet):
     alphabet_set = set()
@@ -76,45 +84,57 @@ def export_moore_automaton_to_csv(moore_automaton, filename):
 
             writer.writerow(row)
 
-    print(f"Moore automaton exported to {filename}")
-
-
-def epsilon_closure(states, moore_automaton, reachable_states=None):
-    if reachable_states is None:
-        reachable_states = set()
+    echo(NORMAL, f"Moore automaton exported to {filename}")
 
-    next_states = set()
-    for state in states:
-        if state not in reachable_states:
-            reachable_states.add(state)  # Mark state as visited
-            for transition in moore_automaton[state]['transitions']:
-                if transition['inputSym'] == "ε":
-                    next_states.update(transition['nextPos'])
 
-    if not next_states:
-        return reachable_states
-    else:
-        return epsilon_closure(next_states, moore_automaton, reachable_states)
+def epsilon_closure_map(moore_automaton):
+    names = list(moore_automaton)
+    ids = {name: i for i, name in enumerate(names)}
+    successors = [
+        [ids[target]
+         for transition in moore_automaton[name]['transitions'] if transition['inputSym'] == "ε"
+         for target in transition['nextPos']]
+        for name in names
+    ]
+    closures = epsilon_closures(successors)
+    return {name: frozenset(names[i] for i in mask_to_states(closures[ids[name]])) for name in names}
 
 
-def convert_nfa_to_dfa(moore_automaton, alphabet):
+def convert_nfa_to_dfa(moore_automaton, alphabet, budget=None, metrics=None):
     dfa_automaton = []
     new_name_state_map = {} # {x0: S0; x1, x2: S2}
     eps_state_map = {} # {x1: x1,x2}
-    queue = []
 
     alphabet = [symbol for symbol in alphabet if symbol != "ε"]
-    for state in moore_automaton:
-        eps_state_map[state] = frozenset(epsilon_closure({state}, moore_automaton))
+    with phase(metrics, 'closure'):
+        eps_state_map.update(epsilon_closure_map(moore_automaton))
+    with phase(metrics, 'construction'):
+        closure_calls = explore_subsets(moore_automaton, alphabet, eps_state_map, dfa_automaton,
+                                        new_name_state_map, budget)
+    if metrics is not None:
+        metrics.count('nfa_states', len(moore_automaton))
+        metrics.count('closure_calls', closure_calls)
+        metrics.count('subset_states', len(new_name_state_map))
+    return dfa_automaton
+
+
+def explore_subsets(moore_automaton, alphabet, eps_state_map, dfa_automaton, new_name_state_map, budget=None):
+    queue = []
 
     start_state = [list(moore_automaton.keys())[0]]
     frozStartState = frozenset(start_state)
     new_name_state_map[frozStartState] = "S0"
     queue.append(start_state)
     counter = 0
+    closure_calls = 0
+    if budget is not None:
+        budget.start()
+        budget.add_state(frozStartState, len(frozStartState))
 
     while queue:
-        print(queue)
+        if budget is not None:
+            budget.check(len(queue))
+        echo(DEBUG, queue)
         currState = queue.pop(0)
         currStateFrozen = frozenset(currState)
         dfa_stateNew = {
@@ -124,6 +144,7 @@ def convert_nfa_to_dfa(moore_automaton, alphabet):
         }
 
         curr_state = frozenset().union(*(eps_state_map[state] for state in currState))
+        closure_calls += 1
         #print("State: ", currState)
 
         for state in curr_state:
@@ -157,21 +178,26 @@ def convert_nfa_to_dfa(moore_automaton, alphabet):
                     counter += 1
                     new_name_state_map[frozSet] = f"S{counter}"
                     queue.append(transition['nextPos'])
+                    if budget is not None:
+                        budget.add_state(frozSet, len(frozSet))
                     #print(frozSet)
                 transition['nextPos'] = new_name_state_map[frozSet]
 
         dfa_automaton.append(dfa_stateNew)
-    return dfa_automaton
+    return closure_calls
 
 
 def main():
+    parser = argparse.ArgumentParser(usage="lab3 grammar.txt output.csv [--max-states N] ...")
+    parser.add_argument('input')
+    parser.add_argument('output')
+    add_budget_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    metrics = metrics_from_args(args, 'd2')
 
-    if len(sys.argv) != 3:
-        print("Usage: lab3 grammar.txt output.csv")
-        sys.exit(1)
-
-    grammar_file = sys.argv[1]
-    output_file = sys.argv[2]
+    grammar_file = args.input
+    output_file = args.output
 
     # grammar_file = "source_nfa.csv"
     # output_file = "out.csv"
@@ -179,7 +205,7 @@ def main():
     alphabet = []   # Алфавит входных символов
 
 
-    with open(grammar_file, 'r', encoding='utf-8') as file:
+    with phase(metrics, 'parse'), open(grammar_file, 'r', encoding='utf-8') as file:
         positions, alphabet = read_moore_to_list(positions, file, alphabet)
 
     moore_automaton = {}
@@ -190,8 +216,14 @@ def main():
             "transitions": state["transitions"]
         }
 
-    dfa_automaton = convert_nfa_to_dfa(moore_automaton, alphabet)
+    try:
+        dfa_automaton = convert_nfa_to_dfa(moore_automaton, alphabet, budget_from_args(args), metrics)
+    except BudgetExceeded as error:
+        print(error.report(), file=sys.stderr)
+        sys.exit(1)
 
-    export_moore_automaton_to_csv(dfa_automaton, output_file)
+    with phase(metrics, 'export'):
+        export_moore_automaton_to_csv(dfa_automaton, output_file)
+    write_metrics(metrics, args)
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
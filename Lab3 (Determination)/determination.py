@@ -1,138 +1,315 @@
+import os
 import sys
 import csv
-from collections import deque, defaultdict
-
-def read_nfa(file_path):
-    """Считывает НКА из CSV файла"""
-    with open(file_path, 'r', encoding='utf-8') as f:
-        reader = csv.reader(f, delimiter=';')
-        data = [row for row in reader]
-
-    outputs = data[0]
-    states = data[1]
-    transitions = data[2:]
-
-    nfa = {}
-    for i in range(1, len(states)):
-        state_name = states[i]
-        nfa[state_name] = {
-            'output': outputs[i],
-            'transitions': defaultdict(list)
-        }
-
-    alphabet = set()
-    for row in transitions:
-        symbol = row[0]
-        if symbol != 'ε':
-            alphabet.add(symbol)
-        for i in range(1, len(row)):
-            if row[i]:
-                targets = row[i].split(',')
-                nfa[states[i]]['transitions'][symbol].extend(targets)
-
-    return nfa, sorted(alphabet)
-
-
-def epsilon_closure(nfa, states):
-    """Вычисляет ε-замыкание для множества состояний"""
-    closure = set(states)
-    queue = deque(states)
-
-    while queue:
-        state = queue.popleft()
-        for target in nfa[state]['transitions'].get('ε', []):
-            if target not in closure:
-                closure.add(target)
-                queue.append(target)
-    return frozenset(closure)
+import argparse
+from collections import deque
+from operator import or_
 
+from alphabet import compress_table
+from budget import BudgetExceeded, add_budget_arguments, budget_from_args
+from closure import epsilon_closures, mask_to_states
 
-def convert(nfa, alphabet):
-    """Конвертирует НКА в ДКА"""
-    start_state = next(iter(nfa))
-    initial = epsilon_closure(nfa, [start_state])
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from automata import binary
+from automata.core import EPSILON, NO_STATE, NFA, DFABuilder
+from automata.metrics import NORMAL, phase, verbose, add_metrics_arguments, metrics_from_args, write_metrics
+from automata.cache import add_cache_arguments, cache_from_args, run_cached
 
-    state_map = {initial: 'S0'}
+def read_nfa(file_path):
+    """Считывает НКА из CSV или двоичного файла; возвращает core.NFA и отсортированный алфавит"""
+    if binary.is_binary_file(file_path):
+        with binary.BinaryAutomaton(file_path) as automaton:
+            nfa = NFA.from_binary(automaton)
+    else:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            nfa = NFA.from_rows(csv.reader(f, delimiter=';'))
+
+    return nfa, sorted(set(nfa.input_names) - {EPSILON})
+
+
+class MaskUnion:
+    """Объединяет строки таблицы по битам маски, кэшируя результат для каждого байта"""
+
+    def __init__(self, rows, width):
+        self.rows = rows
+        self.width = width
+        self.size = (len(rows) + 7) // 8
+        self.chunks = [{} for _ in range(self.size)]
+        # Примерный объём кэша байтов: его учитывает ленивый ДКА
+        self.memory = 0
+
+    def chunk(self, position, byte):
+        row = [0] * self.width
+        base = position * 8
+        for bit in mask_to_states(byte):
+            row = list(map(or_, row, self.rows[base + bit]))
+        self.chunks[position][byte] = row
+        self.memory += sys.getsizeof(row) + sum(map(sys.getsizeof, row))
+        return row
+
+    def clear(self):
+        for chunks in self.chunks:
+            chunks.clear()
+        self.memory = 0
+
+    def union(self, mask):
+        result = [0] * self.width
+        chunks = self.chunks
+        for position, byte in enumerate(mask.to_bytes(self.size, 'little')):
+            if byte:
+                row = chunks[position].get(byte)
+                if row is None:
+                    row = self.chunk(position, byte)
+                result = list(map(or_, result, row))
+        return result
+
+
+def index_nfa(nfa, alphabet):
+    """Строит переходы core.NFA над битовыми масками состояний"""
+    names = nfa.state_names
+    width = nfa.num_states
+    input_ids = nfa.input_ids()
+    offsets = nfa.offsets
+    targets = nfa.targets
+
+    def column_masks(symbol):
+        masks = [0] * len(names)
+        symbol_id = input_ids.get(symbol)
+        if symbol_id is None:
+            return masks
+        base = symbol_id * width
+        for state in range(width):
+            mask = 0
+            for target in targets[offsets[base + state]:offsets[base + state + 1]]:
+                mask |= 1 << target
+            masks[state] = mask
+        return masks
+
+    columns = [column_masks(symbol) for symbol in alphabet]
+    moves = [list(row) for row in zip(*columns)] if columns else [[] for _ in names]
+    epsilon = column_masks(EPSILON)
+    final_mask = 0
+    for state in range(width):
+        if nfa.state_output(state) == 'F':
+            final_mask |= 1 << state
+    return names, moves, epsilon, final_mask
+
+
+def epsilon_closure(closures, mask):
+    """Объединяет заранее посчитанные ε-замыкания состояний из маски"""
+    closure = 0
+    for state in mask_to_states(mask):
+        closure |= closures[state]
+    return closure
+
+
+def closed_transitions(nfa, alphabet):
+    """Нумерует НКА и замыкает его переходы по ε.
+
+    ε-замыкание объединения равно объединению замыканий, поэтому переход
+    подмножества по символу — просто OR замкнутых строк его состояний.
+    Возвращает имена состояний, замкнутые строки, начальное подмножество
+    и маску финальных состояний.
+    """
+    names, moves, epsilon, final_mask = index_nfa(nfa, alphabet)
+    closures = epsilon_closures([list(mask_to_states(mask)) for mask in epsilon])
+    closed_moves = [[epsilon_closure(closures, mask) for mask in row] for row in moves]
+    return names, closed_moves, closures[0], final_mask
+
+
+def compress_alphabet(closed_moves, alphabet):
+    """Объединяет символы с одинаковыми замкнутыми столбцами переходов.
+
+    Возвращает символы каждого класса и таблицу переходов по классам;
+    обратно в символы переходы разворачиваются только при записи состояния.
+    """
+    classes, _, class_moves = compress_table(closed_moves, len(alphabet))
+    class_symbols = [[alphabet[index] for index in members if alphabet[index] != EPSILON]
+                     for members in classes]
+    return class_symbols, class_moves
+
+
+def dfa_output(mask, final_mask):
+    return 'F' if mask & final_mask else ''
+
+
+def class_positions(class_symbols, alphabet):
+    """Номера символов алфавита для каждого класса"""
+    positions = {symbol: index for index, symbol in enumerate(alphabet)}
+    return [[positions[symbol] for symbol in symbols] for symbols in class_symbols]
+
+
+def name_subsets(names, state_map):
+    """Переводит ключи state_map из битовых масок в множества имён состояний НКА"""
+    return {
+        frozenset(names[state] for state in mask_to_states(mask)): name
+        for mask, name in state_map.items()
+    }
+
+
+def convert(nfa, alphabet, budget=None, metrics=None):
+    """Конвертирует core.NFA в core.DFA, подмножества хранятся как битовые маски.
+
+    Возвращает ДКА (состояния S0, S1, ... в порядке обнаружения) и
+    соответствие подмножеств НКА именам состояний ДКА. budget —
+    необязательный budget.Budget: при превышении лимита построение
+    прерывается исключением BudgetExceeded. metrics — необязательный
+    metrics.Metrics для фаз closure/construction и счётчиков.
+    """
+    with phase(metrics, 'closure'):
+        names, closed_moves, initial, final_mask = closed_transitions(nfa, alphabet)
+        class_symbols, class_moves = compress_alphabet(closed_moves, alphabet)
+    with phase(metrics, 'construction'):
+        dfa, state_ids = build_subsets(class_symbols, class_moves, initial, final_mask, alphabet, budget)
+    if metrics is not None:
+        metrics.count('nfa_states', len(names))
+        metrics.count('closure_calls', len(names) * len(alphabet))
+        metrics.count('symbol_classes', len(class_symbols))
+        metrics.count('subset_states', len(state_ids))
+
+    state_map = {mask: f'S{index}' for mask, index in state_ids.items()}
+    return dfa, name_subsets(names, state_map)
+
+
+def build_subsets(class_symbols, class_moves, initial, final_mask, alphabet, budget=None):
+    """Обход подмножеств; возвращает ДКА и номера состояний по маскам"""
+    positions = class_positions(class_symbols, alphabet)
+    step = MaskUnion(class_moves, len(class_symbols))
+
+    state_ids = {initial: 0}
     queue = deque([initial])
-    dfa_states = []
-    state_counter = 0
+    dfa = DFABuilder(alphabet)
+    if budget is not None:
+        budget.start()
+        budget.add_state(initial, initial.bit_count())
 
     while queue:
+        if budget is not None:
+            budget.check(len(queue))
         current = queue.popleft()
-        current_name = state_map[current]
-
-        # Определение финального состояния
-        is_final = any(nfa[s]['output'] == 'F' for s in current)
+        row = [NO_STATE] * len(alphabet)
 
-        new_state = {
-            'name': current_name,
-            'output': 'F' if is_final else '',
-            'transitions': defaultdict(list)
-        }
+        # Переходы по всем классам символов сразу — объединение строк таблицы
+        targets = step.union(current)
 
-        # Обработка переходов для каждого символа
-        for symbol in alphabet:
-            if symbol == 'ε':
+        for class_index, symbols in enumerate(positions):
+            closure = targets[class_index]
+            if not closure:
                 continue
 
-            # Собираем все прямые переходы
-            targets = set()
-            for state in current:
-                targets.update(nfa[state]['transitions'].get(symbol, []))
+            target = state_ids.get(closure)
+            if target is None:
+                target = state_ids[closure] = len(state_ids)
+                queue.append(closure)
+                if budget is not None:
+                    budget.add_state(closure, closure.bit_count())
 
-            if not targets:
-                continue
+            for symbol in symbols:
+                row[symbol] = target
 
-            # Вычисляем полное ε-замыкание
-            closure = epsilon_closure(nfa, targets)
+        dfa.add_state(f'S{state_ids[current]}', dfa_output(current, final_mask), row)
+
+    return dfa.build(), state_ids
 
-            # Регистрируем новое состояние
-            if closure not in state_map:
-                state_counter += 1
-                state_map[closure] = f'S{state_counter}'
-                queue.append(closure)
 
-            new_state['transitions'][symbol] = [state_map[closure]]
+def used_inputs(dfa):
+    """Номера входов, по которым есть хотя бы один переход, в порядке имён"""
+    width = dfa.num_states
+    table = dfa.table
+    used = [i for i in range(dfa.num_inputs) if any(t != NO_STATE for t in table[i * width:(i + 1) * width])]
+    used.sort(key=dfa.input_names.__getitem__)
+    return used
 
-        dfa_states.append(new_state)
 
-    return dfa_states, state_map
+def dfa_table(dfa):
+    """Раскладка ДКА в том виде, в каком она пишется в CSV: имена, выходы, символы и строки переходов.
 
+    Входы, по которым нет ни одного перехода, в таблицу не попадают.
+    """
+    names = dfa.state_names
+    width = dfa.num_states
+    table = dfa.table
+    used = used_inputs(dfa)
+    symbols = [dfa.input_names[i] for i in used]
+    outputs = [dfa.state_output(state) for state in range(width)]
+    rows = [[names[t] if t != NO_STATE else '' for t in table[i * width:(i + 1) * width]] for i in used]
+    return names[:width], outputs, symbols, rows
 
-def export_dfa(dfa_states, state_map, output_file):
+
+def export_dfa(dfa, state_map, output_file):
     """Экспортирует ДКА в CSV и выводит маппинг"""
     # Вывод соответствия состояний
-    print("States mapping:")
-    for dfa_state in sorted(state_map.values(), key=lambda x: int(x[1:])):
-        nfa_states = sorted([s for s in state_map if state_map[s] == dfa_state][0])
-        print(f"{dfa_state} -> {','.join(nfa_states)}")
+    if verbose(NORMAL):
+        print("States mapping:")
+        for subset, dfa_state in sorted(state_map.items(), key=lambda item: int(item[1][1:])):
+            print(f"{dfa_state} -> {','.join(sorted(subset))}")
+    write_dfa(dfa, output_file)
+
 
-    # Подготовка данных для CSV
-    symbols = sorted({sym for s in dfa_states for sym in s['transitions']})
-    header = [''] + [s['name'] for s in dfa_states]
-    output_row = [''] + [s['output'] for s in dfa_states]
+def write_dfa(dfa, output_file):
+    """Пишет ДКА в CSV или .autb без печати соответствия"""
+    names, outputs, symbols, rows = dfa_table(dfa)
+
+    if binary.is_binary_path(output_file):
+        table = [[''] + outputs, [''] + names]
+        table.extend([symbol] + row for symbol, row in zip(symbols, rows))
+        binary.write_rows(output_file, table, binary.KIND_MOORE)
+        return
 
     with open(output_file, 'w', newline='', encoding='utf-8') as f:
         writer = csv.writer(f, delimiter=';')
-        writer.writerow(output_row)
-        writer.writerow(header)
-
-        for symbol in symbols:
-            row = [symbol]
-            for state in dfa_states:
-                targets = state['transitions'].get(symbol, [''])
-                row.append(','.join(targets))
-            writer.writerow(row)
+        writer.writerow([''] + outputs)
+        writer.writerow([''] + names)
+
+        for symbol, row in zip(symbols, rows):
+            writer.writerow([symbol] + row)
+
+
+def determinize_file(args, metrics=None):
+    """Чтение, построение и экспорт ДКА; False, если ДКА не записан"""
+    with phase(metrics, 'parse'):
+        nfa, alphabet = read_nfa(args.input)
+    budget = budget_from_args(args)
+    try:
+        if args.workers > 1:
+            from parallel import convert_parallel
+            dfa, state_map = convert_parallel(nfa, alphabet, args.workers, budget=budget, metrics=metrics)
+        else:
+            dfa, state_map = convert(nfa, alphabet, budget, metrics)
+    except BudgetExceeded as error:
+        print(error.report(), file=sys.stderr)
+        if not args.fallback_words:
+            sys.exit(1)
+        from lazy_dfa import LazyDFA, read_words
+        matcher = LazyDFA(nfa, alphabet)
+        matcher.fallback_reason = error
+        for word in read_words(args.fallback_words):
+            print(f"{''.join(word)} -> {'accept' if matcher.match(word) else 'reject'}")
+        return False
+
+    with phase(metrics, 'export'):
+        export_dfa(dfa, state_map, args.output)
+    return True
 
 
 def main():
-    if len(sys.argv) != 3:
-        print("Usage: ./lab4 input.csv output.csv")
-        sys.exit(1)
-
-    nfa, alphabet = read_nfa(sys.argv[1])
-    dfa_states, state_map = convert(nfa, alphabet)
-    export_dfa(dfa_states, state_map, sys.argv[2])
+    parser = argparse.ArgumentParser(usage="./lab4 input.csv output.csv [--workers N] [--max-states N] ...")
+    parser.add_argument('input')
+    parser.add_argument('output')
+    parser.add_argument('--workers', type=int, default=0,
+                        help="число процессов для параллельного построения подмножеств")
+    add_budget_arguments(parser)
+    parser.add_argument('--fallback-words', metavar='WORDS',
+                        help="при превышении лимита проверить слова из файла ленивым автоматом")
+    add_metrics_arguments(parser)
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+    metrics = metrics_from_args(args, 'determination')
+    # Запись кэша не знает о лимитах: попадание вернуло бы ДКА, который лимит запретил
+    cache = cache_from_args(args) if budget_from_args(args) is None else None
+    run_cached(cache, lambda: determinize_file(args, metrics), 'determinize', args.input, args.output,
+               metrics=metrics)
+    write_metrics(metrics, args)
 
 
 if __name__ == "__main__":
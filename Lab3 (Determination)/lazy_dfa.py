@@ -0,0 +1,181 @@
+import sys
+import argparse
+from collections import OrderedDict
+
+from budget import BudgetExceeded
+from determination import MaskUnion, closed_transitions, compress_alphabet, convert, read_nfa
+
+DEFAULT_CACHE_BYTES = 8 << 20
+EVICTION_POLICIES = ('lru', 'flush')
+
+
+class CachedState:
+    """Состояние ДКА в кэше: подмножество НКА и лениво посчитанные переходы"""
+
+    __slots__ = ('mask', 'accepting', 'successors', 'size')
+
+    def __init__(self, mask, accepting):
+        self.mask = mask
+        self.accepting = accepting
+        self.successors = None
+        self.size = sys.getsizeof(mask)
+
+
+class LazyDFA:
+    """Проверка принадлежности слов без построения полного ДКА.
+
+    Состояния ДКА создаются только тогда, когда слово в них приходит, и
+    хранятся в кэше ограниченного размера. При переполнении кэш либо
+    вытесняет давно не использованные состояния ('lru'), либо очищается
+    целиком ('flush'), как в RE2.
+    """
+
+    def __init__(self, nfa, alphabet, max_memory=DEFAULT_CACHE_BYTES, eviction='lru'):
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy: {eviction}")
+
+        _, closed_moves, self.start, self.final_mask = closed_transitions(nfa, alphabet)
+        class_symbols, class_moves = compress_alphabet(closed_moves, alphabet)
+
+        self.symbols = {symbol: index for index, symbols in enumerate(class_symbols) for symbol in symbols}
+        self.step = MaskUnion(class_moves, len(class_symbols))
+        self.max_memory = max_memory
+        self.eviction = eviction
+
+        self.cache = OrderedDict()
+        self.memory = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.flushes = 0
+        self.fallback_reason = None
+
+    def state(self, mask, current=None):
+        cached = self.cache.get(mask)
+        if cached is not None:
+            self.cache.move_to_end(mask)
+            return cached
+
+        cached = CachedState(mask, bool(mask & self.final_mask))
+        self.cache[mask] = cached
+        self.memory += cached.size
+        self.shrink(cached, current)
+        return cached
+
+    def expand(self, state, current=None):
+        memo = self.step.memory
+        state.successors = self.step.union(state.mask)
+        added = sys.getsizeof(state.successors) + sum(sys.getsizeof(mask) for mask in state.successors)
+        state.size += added
+        # Новые строки кэша байтов MaskUnion тоже занимают память под лимитом
+        self.memory += added + self.step.memory - memo
+        self.shrink(state, current)
+
+    def shrink(self, keep, current=None):
+        """Освобождает кэш, не трогая состояния, через которые сейчас идёт слово"""
+        if self.memory <= self.max_memory:
+            return
+        # Кэшу байтов MaskUnion достаётся не больше половины лимита, остальное — состояниям
+        if self.step.memory > self.max_memory // 2:
+            self.memory -= self.step.memory
+            self.step.clear()
+            if self.memory <= self.max_memory:
+                return
+        pinned = {keep.mask}
+        if current is not None:
+            pinned.add(current.mask)
+
+        if self.eviction == 'flush':
+            self.flushes += 1
+            self.evictions += len(self.cache) - len(pinned)
+            kept = [self.cache[mask] for mask in pinned if mask in self.cache]
+            self.cache.clear()
+            self.memory = 0
+            for state in kept:
+                self.cache[state.mask] = state
+                self.memory += state.size
+            return
+
+        while self.memory > self.max_memory and len(self.cache) > len(pinned):
+            mask, state = self.cache.popitem(last=False)
+            if mask in pinned:
+                self.cache[mask] = state
+                continue
+            self.memory -= state.size
+            self.evictions += 1
+
+    def match(self, word):
+        """Проверяет, допускает ли автомат слово — последовательность символов алфавита"""
+        current = self.state(self.start)
+        for symbol in word:
+            index = self.symbols.get(symbol)
+            if index is None:
+                return False
+
+            successors = current.successors
+            if successors is not None and (not successors[index] or successors[index] in self.cache):
+                self.hits += 1
+            else:
+                self.misses += 1
+                if current.successors is None:
+                    self.expand(current)
+
+            target = current.successors[index]
+            if not target:
+                return False
+            current = self.state(target, current)
+        return current.accepting
+
+    def match_many(self, words):
+        return [self.match(word) for word in words]
+
+    def stats(self):
+        return {
+            'states': len(self.cache),
+            'memory': self.memory,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'flushes': self.flushes,
+        }
+
+
+def convert_with_fallback(nfa, alphabet, budget, max_memory=DEFAULT_CACHE_BYTES, eviction='lru'):
+    """Строит полный ДКА в рамках бюджета, а при превышении возвращает LazyDFA.
+
+    Возвращает пару (результат determination.convert или None, LazyDFA или None);
+    причина отката сохраняется в атрибуте fallback_reason ленивого автомата.
+    """
+    try:
+        return convert(nfa, alphabet, budget), None
+    except BudgetExceeded as error:
+        matcher = LazyDFA(nfa, alphabet, max_memory, eviction)
+        matcher.fallback_reason = error
+        return None, matcher
+
+
+def read_words(file_path):
+    """Слова по одному на строку; многосимвольные символы разделяются пробелами"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            yield line.split() if ' ' in line else list(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ленивая проверка слов по НКА без построения полного ДКА")
+    parser.add_argument('nfa', help="НКА в формате CSV")
+    parser.add_argument('words', help="файл со словами, по одному на строку")
+    parser.add_argument('--max-memory', type=int, default=DEFAULT_CACHE_BYTES, help="лимит кэша состояний в байтах")
+    parser.add_argument('--eviction', choices=EVICTION_POLICIES, default='lru')
+    args = parser.parse_args()
+
+    nfa, alphabet = read_nfa(args.nfa)
+    matcher = LazyDFA(nfa, alphabet, args.max_memory, args.eviction)
+    for word in read_words(args.words):
+        print(f"{''.join(word)} -> {'accept' if matcher.match(word) else 'reject'}")
+    print(matcher.stats())
+
+
+if __name__ == "__main__":
+    main()
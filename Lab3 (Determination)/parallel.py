@@ -0,0 +1,130 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from determination import (MaskUnion, NO_STATE, DFABuilder, class_positions, closed_transitions,
+                           compress_alphabet, dfa_output, name_subsets)
+from automata.metrics import phase
+
+# Фронт меньше этого размера дешевле обработать в координаторе, чем отправлять в пул
+MIN_PARALLEL_FRONTIER = 64
+
+
+class SharedRows:
+    """Замкнутые строки переходов НКА, лежащие в разделяемой памяти.
+
+    Строка состояния — width масок по row_bytes байт подряд. Воркер читает
+    только те строки, которые встречаются в его подмножествах.
+    """
+
+    def __init__(self, buffer, count, width, row_bytes):
+        self.buffer = buffer
+        self.count = count
+        self.width = width
+        self.row_bytes = row_bytes
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, state):
+        size = self.row_bytes
+        start = state * self.width * size
+        return [
+            int.from_bytes(self.buffer[offset:offset + size], 'little')
+            for offset in range(start, start + self.width * size, size)
+        ]
+
+
+def share_rows(closed_moves, width):
+    row_bytes = max(1, (len(closed_moves) + 7) // 8)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, len(closed_moves) * width * row_bytes))
+    offset = 0
+    for row in closed_moves:
+        for mask in row:
+            shm.buf[offset:offset + row_bytes] = mask.to_bytes(row_bytes, 'little')
+            offset += row_bytes
+    return shm, row_bytes
+
+
+_worker = {}
+
+
+def attach_worker(name, count, width, row_bytes):
+    shm = shared_memory.SharedMemory(name=name)
+    _worker['shm'] = shm
+    _worker['step'] = MaskUnion(SharedRows(shm.buf, count, width, row_bytes), width)
+
+
+def expand_chunk(subsets):
+    step = _worker['step']
+    return [step.union(subset) for subset in subsets]
+
+
+def chunked(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def convert_parallel(nfa, alphabet, workers=None, chunk_size=None, budget=None, metrics=None):
+    """Построение подмножеств по уровням BFS на пуле процессов.
+
+    Воркеры считают переходы для кусков фронта, координатор по порядку
+    выдаёт номера новым подмножествам, поэтому нумерация и результат
+    совпадают с determination.convert. Фазы и счётчики metrics — те же.
+    """
+    workers = workers or os.cpu_count() or 1
+    with phase(metrics, 'closure'):
+        names, closed_moves, initial, final_mask = closed_transitions(nfa, alphabet)
+        class_symbols, closed_moves = compress_alphabet(closed_moves, alphabet)
+    positions = class_positions(class_symbols, alphabet)
+    width = len(class_symbols)
+    local_step = MaskUnion(closed_moves, width)
+
+    state_ids = {initial: 0}
+    dfa = DFABuilder(alphabet)
+    frontier = [initial]
+    if budget is not None:
+        budget.start()
+        budget.add_state(initial, initial.bit_count())
+
+    shm, row_bytes = share_rows(closed_moves, width)
+    try:
+        with phase(metrics, 'construction'), \
+                ProcessPoolExecutor(max_workers=workers, initializer=attach_worker,
+                                    initargs=(shm.name, len(closed_moves), width, row_bytes)) as pool:
+            while frontier:
+                if len(frontier) < MIN_PARALLEL_FRONTIER:
+                    rows = [local_step.union(subset) for subset in frontier]
+                else:
+                    size = chunk_size or max(1, len(frontier) // (workers * 4))
+                    rows = [row for chunk in pool.map(expand_chunk, chunked(frontier, size)) for row in chunk]
+
+                next_frontier = []
+                for current, targets in zip(frontier, rows):
+                    row = [NO_STATE] * len(alphabet)
+                    for class_index, symbols in enumerate(positions):
+                        closure = targets[class_index]
+                        if not closure:
+                            continue
+                        target = state_ids.get(closure)
+                        if target is None:
+                            target = state_ids[closure] = len(state_ids)
+                            next_frontier.append(closure)
+                            if budget is not None:
+                                budget.add_state(closure, closure.bit_count())
+                        for symbol in symbols:
+                            row[symbol] = target
+                    dfa.add_state(f'S{state_ids[current]}', dfa_output(current, final_mask), row)
+                    if budget is not None:
+                        budget.check(len(next_frontier))
+                frontier = next_frontier
+    finally:
+        shm.close()
+        shm.unlink()
+    if metrics is not None:
+        metrics.count('nfa_states', len(names))
+        metrics.count('closure_calls', len(names) * len(alphabet))
+        metrics.count('symbol_classes', width)
+        metrics.count('subset_states', len(state_ids))
+
+    state_map = {mask: f'S{index}' for mask, index in state_ids.items()}
+    return dfa.build(), name_subsets(names, state_map)
@@ -1,91 +1,103 @@
+import os
 import sys
 import re
+from collections import defaultdict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from automata.metrics import NORMAL, phase, verbose, split_metrics_arguments, metrics_from_args, write_metrics
+
+WRITE_BUFFER_SIZE = 1 << 20
+LEFT_LINEAR_PATTERN = re.compile(r"<(?:\d|\w)+>\s+\S")
 
 
 def main():
-    if len(sys.argv) < 3:
-        print("Usage: python script.py <grammar.txt> <output.csv>")
+    metrics_args, args = split_metrics_arguments(sys.argv[1:])
+    if len(args) < 2:
+        print("Usage: python script.py <grammar.txt> <output.csv> [--metrics FILE] [--profile [FILE]] [--trace-memory] [-v|-q]")
         sys.exit(1)
 
-    inp, out = sys.argv[1], sys.argv[2]
+    inp, out = args[0], args[1]
+    metrics = metrics_from_args(metrics_args, 'grammar')
     lines, prods = [], []
 
-    with open(inp, 'r', encoding='utf-8') as f:
+    with phase(metrics, 'parse'), open(inp, 'r', encoding='utf-8') as f:
         curr = f.readline()
         while curr:
-            block = curr
+            block = [curr]
             curr = f.readline()
             while curr and "->" not in curr:
-                block += curr
+                block.append(curr)
                 curr = f.readline()
-            lhs_rhs = block.split("->", 1)
+            lhs_rhs = "".join(block).split("->", 1)
             if len(lhs_rhs) == 2:
                 lhs = lhs_rhs[0].strip()
                 rhs = lhs_rhs[1].strip()
                 alts = [x.strip() for x in rhs.split("|")]
                 prods.append({"lhs": lhs, "rhs": alts})
 
-    pattern = re.compile(r"<(?:\d|\w)+>\s+\S")
-    left_linear = any(pattern.match(alt) for p in prods for alt in p["rhs"])
+    with phase(metrics, 'construction'):
+        left_linear = any(LEFT_LINEAR_PATTERN.match(alt) for p in prods for alt in p["rhs"])
 
-    st_map = {}
-    if left_linear:
-        st_map["F"] = "q0"
-        idx = 1
-        for i in range(1, len(prods)):
-            st_map[prods[i]["lhs"]] = f"q{idx}"
-            idx += 1
-        st_map[prods[0]["lhs"]] = f"q{len(st_map)}"
-    else:
-        for i, p in enumerate(prods):
-            st_map[p["lhs"]] = f"q{i}"
-        st_map["F"] = f"q{len(st_map)}"
+        st_map = {}
+        if left_linear:
+            st_map["F"] = "q0"
+            idx = 1
+            for i in range(1, len(prods)):
+                st_map[prods[i]["lhs"]] = f"q{idx}"
+                idx += 1
+            st_map[prods[0]["lhs"]] = f"q{len(st_map)}"
+        else:
+            for i, p in enumerate(prods):
+                st_map[p["lhs"]] = f"q{i}"
+            st_map["F"] = f"q{len(st_map)}"
 
-    transitions, symbols = [], []
-    for p in prods:
-        left_side = p["lhs"]
-        for alt in p["rhs"]:
-            tokens = [x for x in alt.split() if x]
-            if not tokens:
-                continue
-            if len(tokens) == 1:
-                arg = tokens[0]
-                if left_linear:
-                    fr, to = st_map["F"], st_map[left_side]
-                else:
-                    fr, to = st_map[left_side], st_map["F"]
-                transitions.append({"from": fr, "to": to, "arg": arg})
-                symbols.append(arg)
-            else:
-                if left_linear:
-                    fr, to, arg = st_map.get(tokens[0], ""), st_map[left_side], tokens[1]
-                else:
-                    fr, to, arg = st_map[left_side], st_map.get(tokens[1], ""), tokens[0]
-                if fr and to:
+        transitions, symbols = [], []
+        for p in prods:
+            left_side = p["lhs"]
+            for alt in p["rhs"]:
+                tokens = [x for x in alt.split() if x]
+                if not tokens:
+                    continue
+                if len(tokens) == 1:
+                    arg = tokens[0]
+                    if left_linear:
+                        fr, to = st_map["F"], st_map[left_side]
+                    else:
+                        fr, to = st_map[left_side], st_map["F"]
                     transitions.append({"from": fr, "to": to, "arg": arg})
                     symbols.append(arg)
+                else:
+                    if left_linear:
+                        fr, to, arg = st_map.get(tokens[0], ""), st_map[left_side], tokens[1]
+                    else:
+                        fr, to, arg = st_map[left_side], st_map.get(tokens[1], ""), tokens[0]
+                    if fr and to:
+                        transitions.append({"from": fr, "to": to, "arg": arg})
+                        symbols.append(arg)
+
+        symbols = sorted(set(symbols))
+        states = sorted(st_map.values(), key=lambda x: int(x[1:]) if x.startswith('q') else -1)
 
-    symbols = sorted(set(symbols))
-    states = sorted(st_map.values(), key=lambda x: int(x[1:]) if x.startswith('q') else -1)
+        # Переходы индексируются по (откуда, символ) один раз, а не ищутся для каждой ячейки
+        targets = defaultdict(list)
+        for t in transitions:
+            targets[(t["from"], t["arg"])].append(t["to"])
 
-    with open(out, 'w', encoding='utf-8') as out:
-        for _ in states:
-            out.write(";")
-        out.write("F\n;")
-        for st in states:
-            out.write(st + ";")
-        out.write("\n")
+    with phase(metrics, 'export'), open(out, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as out:
+        out.write(";" * len(states) + "F\n;")
+        out.write("".join(st + ";" for st in states) + "\n")
         for sym in symbols:
-            out.write(sym + ";")
-            for st in states:
-                tgts = [t["to"] for t in transitions if t["from"] == st and t["arg"] == sym]
-                if tgts:
-                    out.write(",".join(tgts))
-                out.write(";")
-            out.write("\n")
+            cells = [",".join(targets.get((st, sym), ())) for st in states]
+            out.write(sym + ";" + "".join(cell + ";" for cell in cells) + "\n")
 
-    for k, v in st_map.items():
-        print(k, "->", v)
+    if verbose(NORMAL):
+        for k, v in st_map.items():
+            print(k, "->", v)
+    if metrics is not None:
+        metrics.count('productions', len(prods))
+        metrics.count('nfa_states', len(states))
+        metrics.count('transitions', len(transitions))
+    write_metrics(metrics, metrics_args)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,24 +1,37 @@
+import os
 import sys
 import re
+import argparse
+from array import array
+from collections import defaultdict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from automata import binary
+from automata.metrics import NORMAL, echo, phase, verbose, add_metrics_arguments, metrics_from_args, write_metrics
+
+WRITE_BUFFER_SIZE = 1 << 20
+NONTERMINAL_PATTERN = re.compile(r'^<[^>]+>$')
 
 def is_nonterminal(s):
-    return re.match(r'^<[^>]+>$', s) is not None
+    return NONTERMINAL_PATTERN.match(s) is not None
 
 def read_grammar(filename):
     productions = []
     with open(filename, 'r', encoding='utf-8') as f:
-        lines = [line.strip() for line in f if line.strip()]
-    for line in lines:
-        if '->' in line:
-            lhs, rhs = line.split('->', 1)
-            productions.append({
-                'lhs': lhs.strip(),
-                'rhs': [alt.strip() for alt in rhs.split('|')]
-            })
-        else:
-            productions[-1]['rhs'].extend(
-                [alt.strip() for alt in line.split('|')]
-            )
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if '->' in line:
+                lhs, rhs = line.split('->', 1)
+                productions.append({
+                    'lhs': lhs.strip(),
+                    'rhs': [alt.strip() for alt in rhs.split('|')]
+                })
+            else:
+                productions[-1]['rhs'].extend(
+                    [alt.strip() for alt in line.split('|')]
+                )
     return productions
 
 def determine_grammar_type(productions):
@@ -94,65 +107,357 @@ def build_nfa(productions, is_left):
     final_state = [start_state] if is_left else [states.get('F', '')]
     return states, transitions, sorted(symbols - {'ε'}), final_state
 
-def write_csv(filename, states, transitions, symbols, finals):
+# Однопроходный разбор: грамматика читается построчно, символы интернируются
+# в целые номера, а рёбра НКА записываются сразу в нейтральной форме
+# (левая часть, первый и второй токен). Направление рёбер зависит от того,
+# левая грамматика или правая, и выбирается уже после прохода без повторного чтения.
+EDGE_EPSILON = 0
+EDGE_TERMINAL = 1
+EDGE_PAIR = 2
+NO_SYMBOL = -1
+
+
+class GrammarStream:
+    __slots__ = ('symbol_ids', 'names', 'nonterminal', 'lhs_order', 'lhs_seen',
+                 'edges', 'left', 'right', 'has_single_term', 'chain_rules', 'current')
+
+    def __init__(self):
+        self.symbol_ids = {}
+        self.names = []
+        self.nonterminal = bytearray()
+        self.lhs_order = []
+        self.lhs_seen = set()
+        self.edges = array('i')
+        self.left = self.right = True
+        self.has_single_term = False
+        self.chain_rules = 0
+        self.current = None
+
+    def intern(self, text):
+        symbol = self.symbol_ids.get(text)
+        if symbol is None:
+            symbol = self.symbol_ids[text] = len(self.names)
+            self.names.append(text)
+            self.nonterminal.append(is_nonterminal(text))
+        return symbol
+
+    def feed(self, line):
+        line = line.strip()
+        if not line:
+            return
+        if '->' in line:
+            lhs, line = line.split('->', 1)
+            self.current = self.intern(lhs.strip())
+            if self.current not in self.lhs_seen:
+                self.lhs_seen.add(self.current)
+                self.lhs_order.append(self.current)
+        elif self.current is None:
+            raise ValueError(f"Alternatives before the first production: {line}")
+        for alt in line.split('|'):
+            self.add_alternative(alt.strip())
+
+    def add_alternative(self, alt):
+        tokens = alt.split()
+        if alt == 'ε':
+            self.has_single_term = True
+            self.edges.extend((EDGE_EPSILON, self.current, NO_SYMBOL, NO_SYMBOL))
+            return
+
+        ids = [self.intern(token) for token in tokens]
+        positions = [i for i, symbol in enumerate(ids) if self.nonterminal[symbol]]
+        if not positions:
+            if len(tokens) != 1:
+                self.left = self.right = False
+        else:
+            if any(pos != 0 for pos in positions):
+                self.left = False
+            if any(pos != len(tokens) - 1 for pos in positions):
+                self.right = False
+
+        if len(ids) == 1:
+            if not self.nonterminal[ids[0]]:
+                self.has_single_term = True
+                self.edges.extend((EDGE_TERMINAL, self.current, ids[0], NO_SYMBOL))
+            else:
+                self.chain_rules += 1
+        elif ids:
+            self.edges.extend((EDGE_PAIR, self.current, ids[0], ids[1]))
+
+
+def read_grammar_stream(filename):
+    grammar = GrammarStream()
+    with open(filename, 'r', encoding='utf-8') as f:
+        for line in f:
+            grammar.feed(line)
+    return grammar
+
+
+# Сокращение грамматики перед построением НКА. Проход работает с дугами того
+# автомата, который строит build_nfa_stream: вершины — нетерминалы и F,
+# ε-альтернатива — ε-переход в начальное состояние, цепное правило A -> B
+# дуг не даёт. Язык записываемого НКА при этом не меняется.
+FINAL_NODE = -2
+
+
+def grammar_arcs(grammar, is_left):
+    """Дуги НКА (откуда, символ, куда); у ε-переходов символ NO_SYMBOL"""
+    start = grammar.lhs_order[0]
+    epsilon = grammar.symbol_ids.get('ε', NO_SYMBOL)
+    arcs = []
+    edges = grammar.edges
+    for i in range(0, len(edges), 4):
+        kind, lhs, first, second = edges[i:i + 4]
+        if kind == EDGE_EPSILON:
+            arcs.append((lhs, NO_SYMBOL, start))
+        elif kind == EDGE_TERMINAL:
+            arcs.append((FINAL_NODE, first, lhs) if is_left else (lhs, first, FINAL_NODE))
+        elif is_left:
+            arcs.append((first, NO_SYMBOL if second == epsilon else second, lhs))
+        else:
+            arcs.append((lhs, NO_SYMBOL if first == epsilon else first, second))
+    return arcs
+
+
+def remove_epsilon_arcs(arcs):
+    """Заменяет ε-переходы копиями обычных дуг из ε-замыкания.
+
+    В ε-замыкание никогда не попадает F (в неё нет ε-дуг), поэтому
+    множество заключительных состояний не меняется.
+    """
+    moves = defaultdict(list)
+    epsilon = defaultdict(list)
+    for source, symbol, target in arcs:
+        if symbol == NO_SYMBOL:
+            epsilon[source].append(target)
+        else:
+            moves[source].append((symbol, target))
+
+    result = dict.fromkeys(arc for arc in arcs if arc[1] != NO_SYMBOL)
+    for source in list(epsilon):
+        closure = [source]
+        seen = {source}
+        for node in closure:
+            for target in epsilon.get(node, ()):
+                if target not in seen:
+                    seen.add(target)
+                    closure.append(target)
+        for node in closure[1:]:
+            for symbol, target in moves.get(node, ()):
+                result[(source, symbol, target)] = None
+    return list(result)
+
+
+def reachable(graph, start):
+    seen = {start}
+    stack = [start]
+    while stack:
+        for target in graph.get(stack.pop(), ()):
+            if target not in seen:
+                seen.add(target)
+                stack.append(target)
+    return seen
+
+
+def useful_nodes(arcs, start, final):
+    """Вершины, которые лежат на каком-нибудь пути из start в final"""
+    forward = defaultdict(list)
+    backward = defaultdict(list)
+    for source, _, target in arcs:
+        forward[source].append(target)
+        backward[target].append(source)
+    return reachable(forward, start) & reachable(backward, final)
+
+
+def reduce_grammar(grammar, is_left):
+    """Убирает бесполезные нетерминалы, ε-альтернативы и цепные правила.
+
+    Полезность считается как в обычной грамматике: нетерминал выводим из
+    начального и сам выводит терминальную цепочку. Для правой грамматики
+    это пути из начального состояния в F, для левой — из F в начальное.
+    Начальный нетерминал остаётся всегда, даже если язык пуст.
+    Возвращает новый GrammarStream и отчёт о сокращении.
+    """
+    start = grammar.lhs_order[0]
+    arcs = grammar_arcs(grammar, is_left)
+    epsilon_count = sum(1 for arc in arcs if arc[1] == NO_SYMBOL)
+    arcs = remove_epsilon_arcs(arcs)
+
+    useful = useful_nodes(arcs, FINAL_NODE, start) if is_left else useful_nodes(arcs, start, FINAL_NODE)
+    arcs = [arc for arc in arcs if arc[0] in useful and arc[2] in useful]
+
+    reduced = GrammarStream()
+    reduced.symbol_ids = grammar.symbol_ids
+    reduced.names = grammar.names
+    reduced.nonterminal = grammar.nonterminal
+    reduced.lhs_order = [nt for nt in grammar.lhs_order if nt == start or nt in useful]
+    reduced.lhs_seen = set(reduced.lhs_order)
+    reduced.left = grammar.left
+    reduced.right = grammar.right
+    reduced.has_single_term = FINAL_NODE in useful
+    for source, symbol, target in arcs:
+        if is_left:
+            if source == FINAL_NODE:
+                reduced.edges.extend((EDGE_TERMINAL, target, symbol, NO_SYMBOL))
+            else:
+                reduced.edges.extend((EDGE_PAIR, target, source, symbol))
+        elif target == FINAL_NODE:
+            reduced.edges.extend((EDGE_TERMINAL, source, symbol, NO_SYMBOL))
+        else:
+            reduced.edges.extend((EDGE_PAIR, source, symbol, target))
+
+    states_before = len(grammar.lhs_order) + grammar.has_single_term
+    states_after = len(reduced.lhs_order) + reduced.has_single_term
+    report = {
+        'states_before': states_before,
+        'states_after': states_after,
+        'states_saved': states_before - states_after,
+        'transitions_before': len(grammar.edges) // 4,
+        'transitions_after': len(arcs),
+        'epsilon_productions': epsilon_count,
+        'chain_rules': grammar.chain_rules,
+        'removed_nonterminals': [grammar.names[nt] for nt in grammar.lhs_order if nt not in reduced.lhs_seen],
+    }
+    return reduced, report
+
+
+def print_reduction(report):
+    echo(NORMAL, f"Reduction: {report['states_before']} -> {report['states_after']} NFA states "
+                 f"({report['states_saved']} saved), "
+                 f"{report['transitions_before']} -> {report['transitions_after']} transitions")
+    echo(NORMAL, f"  ε-productions eliminated: {report['epsilon_productions']}, "
+                 f"chain rules dropped: {report['chain_rules']}")
+    if report['removed_nonterminals']:
+        echo(NORMAL, "  useless nonterminals: " + ', '.join(report['removed_nonterminals']))
+
+
+def build_nfa_stream(grammar, is_left):
+    """То же, что build_nfa, но по рёбрам, собранным GrammarStream"""
+    names = grammar.names
+    states = {names[nt]: f'q{i}' for i, nt in enumerate(grammar.lhs_order)}
+    if grammar.has_single_term:
+        states['F'] = f'q{len(states)}'
+
+    start_state = states[names[grammar.lhs_order[0]]]
+    transitions = []
+    symbols = set()
+    edges = grammar.edges
+    for i in range(0, len(edges), 4):
+        kind, lhs, first, second = edges[i:i + 4]
+        lhs_state = states[names[lhs]]
+        if kind == EDGE_EPSILON:
+            transitions.append((lhs_state, 'ε', start_state))
+            symbols.add('ε')
+            continue
+
+        if kind == EDGE_TERMINAL:
+            term = names[first]
+            if is_left:
+                transitions.append((states['F'], term, lhs_state))
+            else:
+                transitions.append((lhs_state, term, states['F']))
+        elif is_left:
+            term = names[second]
+            transitions.append((states[names[first]], term, lhs_state))
+        else:
+            term = names[first]
+            transitions.append((lhs_state, term, states[names[second]]))
+        symbols.add(term)
+
+    final_state = [start_state] if is_left else [states.get('F', '')]
+    return states, transitions, sorted(symbols - {'ε'}), final_state
+
+def nfa_table(states, transitions, symbols):
+    """Раскладка НКА в том виде, в каком она пишется в CSV.
+
+    Возвращает порядок состояний, строку выходов и строки переходов
+    (символ, цели для каждого состояния).
+    """
     # Упорядочиваем состояния: сначала все кроме F, потом F (если есть)
     ordered_states = sorted(
         [s for s in states.values() if s != states.get('F', None)],
         key=lambda x: int(x[1:])
     )
-    has_f = 'F' in states
-    if has_f:
+    outputs = [''] * len(ordered_states)
+    if 'F' in states:
         ordered_states.append(states['F'])
+        outputs.append('F')
+
+    # Переходы индексируются по (откуда, символ) один раз, а не ищутся для каждой ячейки
+    targets_by_source = defaultdict(list)
+    for source, sym, target in transitions:
+        targets_by_source[(source, sym)].append(target)
+
+    rows = []
+    for sym in symbols:
+        rows.append((sym, [targets_by_source.get((st, sym), []) for st in ordered_states]))
+    # Эпсилон-переходы
+    if any(t[1] == 'ε' for t in transitions):
+        rows.append(('ε', [targets_by_source.get((st, 'ε'), []) for st in ordered_states]))
+    return ordered_states, outputs, rows
 
-    with open(filename, 'w', encoding='utf-8') as f:
+def write_table(filename, outputs, ordered_states, rows):
+    with open(filename, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as f:
         # Первая строка: заголовок с F
-        f.write(';' * (len(ordered_states) - (1 if has_f else 0)))
-        if has_f:
-            f.write(';F')
-        f.write('\n')
+        f.write(';' + ';'.join(outputs) + '\n')
 
         # Вторая строка: метки состояний
         f.write(';' + ';'.join(ordered_states) + '\n')
 
-        # Транзиции для символов
-        for sym in symbols:
-            line = [sym]
-            for st in ordered_states:
-                targets = [t[2] for t in transitions if t[0] == st and t[1] == sym]
-                line.append(','.join(targets) if targets else '')
-            f.write(';'.join(line) + '\n')
-
-        # Эпсилон-переходы
-        eps_lines = [t for t in transitions if t[1] == 'ε']
-        if eps_lines:
-            f.write('ε')
-            for st in ordered_states:
-                targets = [t[2] for t in eps_lines if t[0] == st]
-                f.write(';' + ','.join(targets) if targets else ';')
-            f.write('\n')
+        # Транзиции для символов, затем эпсилон-переходы
+        for sym, cells in rows:
+            f.write(sym + ';' + ';'.join(','.join(targets) for targets in cells) + '\n')
+
+def write_csv(filename, states, transitions, symbols, finals):
+    ordered_states, outputs, rows = nfa_table(states, transitions, symbols)
+    has_f = 'F' in states
+
+    if binary.is_binary_path(filename):
+        table = [[''] + outputs, [''] + ordered_states]
+        table.extend([sym] + [','.join(targets) for targets in cells] for sym, cells in rows)
+        binary.write_rows(filename, table, binary.KIND_MOORE)
+    else:
+        write_table(filename, outputs, ordered_states, rows)
 
     # Вывод в консоль
-    print("States mapping:")
-    for nt, state in states.items():
-        print(f"{nt} -> {state}")
-    if has_f:
-        print("Final state: F")
+    if verbose(NORMAL):
+        print("States mapping:")
+        for nt, state in states.items():
+            print(f"{nt} -> {state}")
+        if has_f:
+            print("Final state: F")
 
 def main():
-    if len(sys.argv) != 3:
-        print("Usage: python nfa_converter.py input.txt output.csv")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(usage="python nfa_converter.py input.txt output.csv [--reduce] [--metrics FILE]")
+    parser.add_argument('input')
+    parser.add_argument('output')
+    parser.add_argument('--reduce', action='store_true',
+                        help="убрать бесполезные нетерминалы, ε-альтернативы и цепные правила")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    metrics = metrics_from_args(args, 'grammar1')
 
-    productions = read_grammar(sys.argv[1])
-    left, right = determine_grammar_type(productions)
+    with phase(metrics, 'parse'):
+        grammar = read_grammar_stream(args.input)
 
-    if not left and not right:
+    if not grammar.left and not grammar.right:
         print("Error: Grammar is not regular")
         sys.exit(1)
 
-    states, transitions, symbols, finals = build_nfa(productions, left)
-    write_csv(sys.argv[2], states, transitions, symbols, finals)
-    print("NFA saved to", sys.argv[2])
+    if args.reduce:
+        with phase(metrics, 'reduction'):
+            grammar, report = reduce_grammar(grammar, grammar.left)
+        print_reduction(report)
+
+    with phase(metrics, 'construction'):
+        states, transitions, symbols, finals = build_nfa_stream(grammar, grammar.left)
+    with phase(metrics, 'export'):
+        write_csv(args.output, states, transitions, symbols, finals)
+    echo(NORMAL, "NFA saved to", args.output)
+    if metrics is not None:
+        metrics.count('nonterminals', len(grammar.lhs_order))
+        metrics.count('nfa_states', len(states))
+        metrics.count('transitions', len(transitions))
+    write_metrics(metrics, args)
 
 
 if __name__ == "__main__":
@@ -0,0 +1 @@
+"""Общие инструменты поверх лабораторных: конвейер грамматика → НКА → ДКА → минимальный ДКА"""
@@ -0,0 +1,219 @@
+"""Замеры времени и пиковой памяти инструментов лабораторных на случайных входах.
+
+    python -m automata.bench [--suite quick|full] [--targets d1,d2] [--sizes 100,1000]
+                             [--repeat N] [--seed S] [--timeout SEC] [--output results.jsonl]
+
+Входы строит automata.generators с заданным seed, поэтому прогоны на разных
+коммитах сравнимы. Каждый замер — отдельный процесс: он импортирует модуль
+лабораторной, засекает только вызов функции (с чтением и записью файлов) и
+сообщает время и пиковый RSS одной строкой JSON. Результат — JSON Lines, по
+строке на цель и размер; сводка печатается в stderr. После таймаута цель
+на больших размерах того же семейства не запускается.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from contextlib import redirect_stdout, redirect_stderr
+
+from automata import labs
+from automata import generators
+from automata.binary import write_csv_rows
+from automata.cache import DISABLE_VARIABLE
+from automata.metrics import peak_rss_kb
+
+GRAMMAR_FAMILIES = ('right-grammar', 'left-grammar')
+NFA_FAMILIES = ('nfa', 'blowup')
+
+# Семейство входов → (расширение файла, генератор строк по размеру и опциям)
+FAMILIES = {
+    'mealy': ('.csv', lambda size, o: generators.mealy_rows(size, o.inputs, o.outputs, o.seed)),
+    'moore': ('.csv', lambda size, o: generators.moore_rows(size, o.inputs, o.outputs, o.seed)),
+    'nfa': ('.csv', lambda size, o: generators.nfa_rows(size, o.inputs, o.density, o.epsilon, seed=o.seed)),
+    'blowup': ('.csv', lambda size, o: generators.blowup_nfa_rows(size, o.epsilon > 0)),
+    'right-grammar': ('.txt', lambda size, o: generators.grammar_lines(size, o.inputs, o.alternatives, False, o.seed)),
+    'left-grammar': ('.txt', lambda size, o: generators.grammar_lines(size, o.inputs, o.alternatives, True, o.seed)),
+}
+
+# Цель → (семейства входов, модуль, функция); main вызывается с sys.argv
+TARGETS = {
+    'mealy-to-moore': (('mealy',), 'MealyMoore', 'convert_mealy_to_moore'),
+    'moore-to-mealy': (('moore',), 'MealyMoore', 'convert_moore_to_mealy'),
+    'minimize-mealy': (('mealy',), 'Minimization', 'process_mealy'),
+    'minimize-moore': (('moore',), 'Minimization', 'process_moore'),
+    'determination': (NFA_FAMILIES, 'determination', 'main'),
+    'd1': (NFA_FAMILIES, 'd1', 'main'),
+    'd2': (NFA_FAMILIES, 'd2', 'main'),
+    'grammar': (GRAMMAR_FAMILIES, 'grammar', 'main'),
+    'grammar1': (GRAMMAR_FAMILIES, 'grammar1', 'main'),
+}
+
+# Размеры по семействам: число состояний, нетерминалов или k для blowup
+SUITES = {
+    'quick': {
+        'mealy': [100, 1000], 'moore': [100, 1000], 'nfa': [20, 50], 'blowup': [4, 8],
+        'right-grammar': [100, 1000], 'left-grammar': [100, 1000],
+    },
+    'full': {
+        'mealy': [1000, 10000, 100000], 'moore': [1000, 10000, 100000], 'nfa': [50, 100, 200],
+        'blowup': [8, 12, 16], 'right-grammar': [1000, 10000, 100000], 'left-grammar': [1000, 10000, 100000],
+    },
+}
+
+
+def run_child(target, input_file, output_file):
+    """Один замер в текущем процессе; печатает JSON с временем и памятью"""
+    _, module_name, function_name = TARGETS[target]
+    module = __import__(module_name)
+    function = getattr(module, function_name)
+    base_rss = peak_rss_kb()
+    result = {'status': 'ok'}
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull), redirect_stderr(devnull):
+        start = time.perf_counter()
+        try:
+            if function_name == 'main':
+                sys.argv = [module_name, input_file, output_file]
+                function()
+            else:
+                function(input_file, output_file)
+        except SystemExit as error:
+            if error.code:
+                result = {'status': 'error', 'error': f"exit code {error.code}"}
+        except Exception as error:
+            result = {'status': 'error', 'error': f"{type(error).__name__}: {error}"}
+        result['seconds'] = time.perf_counter() - start
+    result['base_rss_kb'] = base_rss
+    result['peak_rss_kb'] = peak_rss_kb()
+    print(json.dumps(result))
+
+
+def measure(target, input_file, output_file, timeout):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [labs.ROOT, env.get('PYTHONPATH')]))
+    # Повторные запуски должны считать заново, а не читать кэш результатов
+    env[DISABLE_VARIABLE] = '1'
+    command = [sys.executable, '-m', 'automata.bench', '--child', target, input_file, output_file]
+    try:
+        completed = subprocess.run(command, capture_output=True, text=True, timeout=timeout, env=env)
+    except subprocess.TimeoutExpired:
+        return {'status': 'timeout', 'seconds': timeout}
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode or not lines:
+        messages = completed.stderr.strip().splitlines()
+        return {'status': 'error', 'error': messages[-1] if messages else f"exit code {completed.returncode}"}
+    return json.loads(lines[-1])
+
+
+def revision():
+    try:
+        completed = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=labs.ROOT,
+                                   capture_output=True, text=True)
+    except OSError:
+        return None
+    return completed.stdout.strip() or None
+
+
+def generate_input(family, size, options, workdir, cache):
+    key = (family, size)
+    if key not in cache:
+        suffix, make = FAMILIES[family]
+        path = os.path.join(workdir, f"{family}-{size}{suffix}")
+        data = make(size, options)
+        if suffix == '.txt':
+            generators.write_grammar(path, data)
+        else:
+            write_csv_rows(path, data)
+        cache[key] = path
+    return cache[key]
+
+
+def run_suite(options, workdir, output):
+    sizes = SUITES[options.suite]
+    common = {
+        'seed': options.seed,
+        'params': {name: getattr(options, name) for name in ('inputs', 'outputs', 'density', 'epsilon', 'alternatives')},
+        'revision': revision(),
+        'python': platform.python_version(),
+    }
+    inputs = {}
+    for target in options.targets:
+        families, _, _ = TARGETS[target]
+        for family in families:
+            for size in options.sizes or sizes[family]:
+                input_file = generate_input(family, size, options, workdir, inputs)
+                output_file = os.path.join(workdir, f"{target}-{family}-{size}.out.csv")
+                runs = [measure(target, input_file, output_file, options.timeout) for _ in range(options.repeat)]
+                record = {'target': target, 'family': family, 'size': size, **common}
+                failed = [run for run in runs if run['status'] != 'ok']
+                if failed:
+                    record.update(failed[0])
+                else:
+                    seconds = [run['seconds'] for run in runs]
+                    record.update(status='ok', runs=len(runs), seconds=seconds, min_seconds=min(seconds),
+                                  median_seconds=statistics.median(seconds),
+                                  base_rss_kb=runs[0]['base_rss_kb'],
+                                  peak_rss_kb=max(run['peak_rss_kb'] or 0 for run in runs) or None)
+                output.write(json.dumps(record, ensure_ascii=False) + '\n')
+                output.flush()
+                print_record(record)
+                if record['status'] == 'timeout':
+                    break
+
+
+def print_record(record):
+    if record['status'] == 'ok':
+        rss = record['peak_rss_kb']
+        details = f"{record['median_seconds']:9.3f} s  {rss / 1024:8.1f} MiB" if rss else f"{record['median_seconds']:9.3f} s"
+    else:
+        details = f"{record['status']} {record.get('error', '')}".rstrip()
+    print(f"{record['target']:15} {record['family']:14} {record['size']:>8}  {details}", file=sys.stderr)
+
+
+def parse_list(text, convert=str):
+    return [convert(item) for item in text.split(',') if item]
+
+
+def main():
+    if len(sys.argv) == 5 and sys.argv[1] == '--child':
+        run_child(*sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(description="Бенчмарки лабораторных на случайных автоматах и грамматиках")
+    parser.add_argument('--suite', choices=SUITES, default='quick', help="набор размеров (по умолчанию quick)")
+    parser.add_argument('--targets', type=parse_list, default=list(TARGETS),
+                        help=f"цели через запятую: {', '.join(TARGETS)}")
+    parser.add_argument('--sizes', type=lambda text: parse_list(text, int),
+                        help="размеры через запятую вместо размеров набора")
+    parser.add_argument('--repeat', type=int, default=3, help="запусков на размер (в отчёте — медиана)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=float, default=300, help="секунд на запуск")
+    parser.add_argument('--inputs', type=int, default=2, help="входных символов или терминалов")
+    parser.add_argument('--outputs', type=int, default=2, help="выходных символов Мили/Мура")
+    parser.add_argument('--density', type=float, default=1.5, help="среднее число целей в ячейке НКА")
+    parser.add_argument('--epsilon', type=float, default=0.2, help="среднее число ε-переходов из состояния НКА")
+    parser.add_argument('--alternatives', type=int, default=3, help="альтернатив у нетерминала")
+    parser.add_argument('--output', default='-', help="файл JSON Lines (по умолчанию stdout)")
+    parser.add_argument('--workdir', help="папка для входов и выходов (по умолчанию временная)")
+    options = parser.parse_args()
+
+    unknown = [target for target in options.targets if target not in TARGETS]
+    if unknown:
+        parser.error(f"unknown targets: {', '.join(unknown)}")
+
+    with tempfile.TemporaryDirectory() as temporary:
+        workdir = options.workdir or temporary
+        os.makedirs(workdir, exist_ok=True)
+        if options.output == '-':
+            run_suite(options, workdir, sys.stdout)
+        else:
+            with open(options.output, 'w', encoding='utf-8') as output:
+                run_suite(options, workdir, output)
+
+
+if __name__ == "__main__":
+    main()
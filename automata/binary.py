@@ -0,0 +1,345 @@
+"""Двоичный формат таблиц автоматов, который читается через mmap без разбора текста.
+
+Файл хранит ту же таблицу, что и CSV лабораторных, только строки
+интернированы, а ячейки заменены номерами int32 (little-endian):
+
+    заголовок            HEADER
+    string_offsets       int32[num_strings + 1] — начала строк в blob и его длина
+    blob                 UTF-8, каждая строка завершается NUL; дополнен
+                         нулями до кратного 4
+    names                int32[num_names] — номера строк имён состояний;
+                         первые num_states — столбцы таблицы, остальные —
+                         цели переходов, которых нет среди столбцов
+    outputs              int32[num_states] — выходы состояний (только Мур)
+    inputs               int32[num_inputs] — входные символы
+    targets              int32[num_inputs * num_states] — номер имени цели
+                         или NO_ID для пустой ячейки; при FLAG_MULTI вместо
+                         этого cell_offsets int32[num_inputs * num_states + 1]
+                         и targets int32[num_targets] (ячейки НКА «q1,q2»)
+    cell_outputs         int32[num_inputs * num_states] — выходы переходов
+                         (только Мили, NO_ID — ячейка без «/»)
+
+Ячейка (вход i, состояние j) лежит по индексу i * num_states + j, как в CSV.
+"""
+import os
+import sys
+import csv
+import mmap
+import struct
+import argparse
+from array import array
+
+MAGIC = b'AUTB'
+VERSION = 1
+SUFFIX = '.autb'
+KIND_MEALY = 0
+KIND_MOORE = 1
+KIND_NAMES = {KIND_MEALY: 'mealy', KIND_MOORE: 'moore'}
+FLAG_MULTI = 1
+NO_ID = -1
+HEADER = struct.Struct('<4sHHIIIIII')
+INT_SIZE = 4
+NATIVE_LITTLE = sys.byteorder == 'little' and array('i').itemsize == INT_SIZE
+STDIO_PATH = '-'
+
+
+def is_binary_path(path):
+    """Выходной файл с расширением SUFFIX пишется в двоичном формате"""
+    return path != STDIO_PATH and path.endswith(SUFFIX)
+
+
+def is_binary_file(path):
+    """Входной файл распознаётся по сигнатуре, а не по расширению"""
+    if path == STDIO_PATH or not os.path.isfile(path):
+        return False
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def padded(size):
+    return (size + INT_SIZE - 1) // INT_SIZE * INT_SIZE
+
+
+class StringTable(dict):
+    """Номера строк в порядке первого появления"""
+
+    def __missing__(self, text):
+        string_id = self[text] = len(self)
+        return string_id
+
+
+def table_kind(rows):
+    """Мур, если вторая строка — заголовок состояний с пустой первой ячейкой"""
+    return KIND_MOORE if len(rows) > 1 and rows[1] and rows[1][0] == '' else KIND_MEALY
+
+
+def encode_rows(rows, kind=None):
+    """Таблица в виде строк csv.reader → байты двоичного файла"""
+    rows = [list(row) for row in rows]
+    if kind is None:
+        kind = table_kind(rows)
+    header_count = 2 if kind == KIND_MOORE else 1
+    if len(rows) < header_count:
+        raise ValueError("Table has no state header")
+
+    strings = StringTable()
+    state_names = rows[header_count - 1][1:]
+    num_states = len(state_names)
+    outputs = array('i')
+    if kind == KIND_MOORE:
+        output_names = rows[0][1:num_states + 1]
+        output_names.extend([''] * (num_states - len(output_names)))
+        outputs.extend(map(strings.__getitem__, output_names))
+
+    name_index = {}
+    names = array('i')
+    for name in state_names:
+        name_index.setdefault(name, len(names))
+        names.append(strings[name])
+
+    def name_id(name):
+        index = name_index.get(name)
+        if index is None:
+            index = name_index[name] = len(names)
+            names.append(strings[name])
+        return index
+
+    body = [row for row in rows[header_count:] if row]
+    multi = kind == KIND_MOORE and any(',' in cell for row in body for cell in row[1:])
+    inputs = array('i')
+    targets = array('i')
+    cell_offsets = array('i', [0]) if multi else array('i')
+    cell_outputs = array('i')
+    for row in body:
+        inputs.append(strings[row[0]])
+        cells = row[1:num_states + 1]
+        cells.extend([''] * (num_states - len(cells)))
+        for cell in cells:
+            if multi:
+                if cell:
+                    targets.extend(map(name_id, cell.split(',')))
+                cell_offsets.append(len(targets))
+            elif kind == KIND_MOORE:
+                targets.append(name_id(cell) if cell else NO_ID)
+            elif not cell:
+                targets.append(NO_ID)
+                cell_outputs.append(NO_ID)
+            else:
+                target, slash, output = cell.partition('/')
+                targets.append(name_id(target))
+                cell_outputs.append(strings[output] if slash else NO_ID)
+
+    blob = bytearray()
+    string_offsets = array('i', [0])
+    for text in strings:
+        blob += text.encode('utf-8')
+        blob.append(0)
+        string_offsets.append(len(blob))
+    blob += bytes(padded(len(blob)) - len(blob))
+
+    header = HEADER.pack(MAGIC, VERSION, kind, FLAG_MULTI if multi else 0, len(strings),
+                         num_states, len(names), len(inputs), len(targets))
+    sections = [string_offsets, names, outputs, inputs, cell_offsets, targets, cell_outputs]
+    if not NATIVE_LITTLE:
+        for section in sections:
+            section.byteswap()
+    parts = [header, string_offsets.tobytes(), bytes(blob)]
+    parts.extend(section.tobytes() for section in sections[1:])
+    return b''.join(parts)
+
+
+def write_rows(path, rows, kind=None):
+    with open(path, 'wb') as f:
+        f.write(encode_rows(rows, kind))
+
+
+class RowsWriter:
+    """Замена csv.writer: собирает строки и пишет двоичный файл при закрытии"""
+
+    def __init__(self, path, kind=None):
+        self.path = path
+        self.kind = kind
+        self.rows = []
+
+    def writerow(self, row):
+        self.rows.append(row)
+
+    def close(self):
+        write_rows(self.path, self.rows, self.kind)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+
+
+class BinaryAutomaton:
+    """Таблица автомата, отображённая в память.
+
+    Массивы int32 доступны как memoryview без копирования (или через
+    numpy(name) как ndarray поверх того же mmap); строки декодируются
+    один раз при первом обращении к strings.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.mm) < HEADER.size:
+            raise ValueError(f"{path}: file is too short")
+        (magic, version, self.kind, self.flags, self.num_strings, self.num_states,
+         self.num_names, self.num_inputs, self.num_targets) = HEADER.unpack_from(self.mm)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not an automaton file")
+        if version != VERSION:
+            raise ValueError(f"{path}: unsupported version {version}")
+        self.multi = bool(self.flags & FLAG_MULTI)
+
+        cells = self.num_inputs * self.num_states
+        self.sections = {}
+        offset = self.section('string_offsets', HEADER.size, self.num_strings + 1)
+        self.blob_offset = offset
+        offset += padded(self.string_offsets[-1])
+        offset = self.section('names', offset, self.num_names)
+        offset = self.section('outputs', offset, self.num_states if self.kind == KIND_MOORE else 0)
+        offset = self.section('inputs', offset, self.num_inputs)
+        offset = self.section('cell_offsets', offset, cells + 1 if self.multi else 0)
+        offset = self.section('targets', offset, self.num_targets)
+        offset = self.section('cell_outputs', offset, cells if self.kind == KIND_MEALY else 0)
+        if offset > len(self.mm):
+            raise ValueError(f"{path}: file is truncated")
+        self._strings = None
+
+    def section(self, name, offset, count):
+        end = offset + count * INT_SIZE
+        view = memoryview(self.mm)[offset:end]
+        if NATIVE_LITTLE:
+            ints = view.cast('i')
+        else:
+            ints = array('i', view.tobytes())
+            ints.byteswap()
+        self.sections[name] = (offset, count)
+        setattr(self, name, ints)
+        return end
+
+    def numpy(self, name):
+        """Секция как ndarray int32 поверх mmap (только для чтения)"""
+        import numpy as np
+
+        offset, count = self.sections[name]
+        return np.frombuffer(self.mm, dtype='<i4', count=count, offset=offset)
+
+    @property
+    def strings(self):
+        if self._strings is None:
+            blob = self.mm[self.blob_offset:self.blob_offset + self.string_offsets[-1]]
+            strings = blob[:-1].decode('utf-8').split('\0') if blob else []
+            if len(strings) != self.num_strings:
+                # В самих строках встретился NUL — режем по смещениям
+                bounds = self.string_offsets
+                strings = [blob[bounds[i]:bounds[i + 1] - 1].decode('utf-8') for i in range(self.num_strings)]
+            self._strings = strings
+        return self._strings
+
+    def state_names(self):
+        strings = self.strings
+        return [strings[i] for i in self.names.tolist()]
+
+    def output_names(self):
+        strings = self.strings
+        return [strings[i] for i in self.outputs.tolist()]
+
+    def input_names(self):
+        strings = self.strings
+        return [strings[i] for i in self.inputs.tolist()]
+
+    def iter_rows(self):
+        """Строки таблицы в том же виде, что вернул бы csv.reader для CSV"""
+        names = self.state_names()
+        width = self.num_states
+        if self.kind == KIND_MOORE:
+            yield [''] + self.output_names()
+        yield [''] + names[:width]
+
+        # Лишнее пустое имя в конце: индекс NO_ID (-1) попадает на него
+        lookup = names + ['']
+        targets = self.targets.tolist()
+        if self.multi:
+            bounds = self.cell_offsets.tolist()
+        elif self.kind == KIND_MEALY:
+            strings = self.strings
+            cell_outputs = self.cell_outputs.tolist()
+        for i, symbol in enumerate(self.input_names()):
+            base = i * width
+            if self.multi:
+                row = [','.join([lookup[t] for t in targets[bounds[c]:bounds[c + 1]]])
+                       for c in range(base, base + width)]
+            elif self.kind == KIND_MOORE:
+                row = [lookup[t] for t in targets[base:base + width]]
+            else:
+                row = [
+                    lookup[t] if o == NO_ID else f"{names[t]}/{strings[o]}"
+                    for t, o in zip(targets[base:base + width], cell_outputs[base:base + width])
+                ]
+            row.insert(0, symbol)
+            yield row
+
+    def close(self):
+        for name in self.sections:
+            view = getattr(self, name)
+            if isinstance(view, memoryview):
+                view.release()
+        self.mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+
+def read_rows(path):
+    """Все строки двоичной таблицы; файл закрывается сразу после чтения"""
+    with BinaryAutomaton(path) as automaton:
+        return list(automaton.iter_rows())
+
+
+def read_csv_rows(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.reader(f, delimiter=';'))
+
+
+def write_csv_rows(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f, delimiter=';').writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Преобразование таблиц автоматов между CSV и двоичным форматом")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    to_binary = subparsers.add_parser('to-binary', help="CSV → двоичный файл")
+    to_binary.add_argument('input')
+    to_binary.add_argument('output')
+    to_binary.add_argument('--kind', choices=('mealy', 'moore'), help="по умолчанию определяется по заголовку")
+    to_csv = subparsers.add_parser('to-csv', help="двоичный файл → CSV")
+    to_csv.add_argument('input')
+    to_csv.add_argument('output')
+    info = subparsers.add_parser('info', help="размеры таблицы в двоичном файле")
+    info.add_argument('input')
+    args = parser.parse_args()
+
+    if args.command == 'to-binary':
+        kind = {'mealy': KIND_MEALY, 'moore': KIND_MOORE}.get(args.kind)
+        write_rows(args.output, read_csv_rows(args.input), kind)
+    elif args.command == 'to-csv':
+        write_csv_rows(args.output, read_rows(args.input))
+    else:
+        with BinaryAutomaton(args.input) as automaton:
+            print(f"kind: {KIND_NAMES[automaton.kind]}{' (multi-target)' if automaton.multi else ''}")
+            print(f"states: {automaton.num_states}, inputs: {automaton.num_inputs}, "
+                  f"strings: {automaton.num_strings}, extra target names: {automaton.num_names - automaton.num_states}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""Кэш результатов инструментов на диске, адресуемый содержимым входа.
+
+Ключ — SHA-256 от операции, её параметров, формата выхода, уровня
+вывода, исходников загруженных модулей репозитория и байтов входного
+файла: правка входа или кода сама делает старые записи недостижимыми.
+Запись хранит выходной файл и всё, что инструмент напечатал в stdout,
+поэтому повторный запуск воспроизводит и файл, и консольный вывод без
+пересчёта.
+
+Каталог — AUTOMATA_CACHE_DIR или ~/.cache/automata, предел размера —
+AUTOMATA_CACHE_SIZE (например 512M, по умолчанию 256M). Вытеснение — LRU
+по времени изменения записи: попадание обновляет его через os.utime.
+Счётчики попаданий и промахов — файлы, к которым дописывается по байту,
+так что параллельные запуски их не портят. Ошибки ввода-вывода кэша
+инструмент не прерывают: он просто считает результат заново.
+
+    python -m automata.cache stats [--json]
+    python -m automata.cache clear
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import struct
+import hashlib
+import argparse
+import tempfile
+
+from automata import binary
+from automata import metrics as metrics_module
+from automata.metrics import phase
+
+MAGIC = b'AUTC'
+ENTRY_HEADER = struct.Struct('<4sI')
+ENTRY_SUFFIX = '.entry'
+DEFAULT_MAX_BYTES = 256 << 20
+DIR_VARIABLE = 'AUTOMATA_CACHE_DIR'
+SIZE_VARIABLE = 'AUTOMATA_CACHE_SIZE'
+DISABLE_VARIABLE = 'AUTOMATA_NO_CACHE'
+SIZE_SUFFIXES = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+STDIO_PATH = '-'
+READ_CHUNK = 1 << 20
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_size(text):
+    """«512M», «2G», «1048576» → байты"""
+    text = text.strip().upper().removesuffix('B')
+    scale = SIZE_SUFFIXES.get(text[-1:], 1)
+    return int(float(text[:-1] if scale != 1 else text) * scale)
+
+
+def default_directory():
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.environ.get(DIR_VARIABLE) or os.path.join(base, 'automata')
+
+
+_fingerprints = {}
+
+
+def source_fingerprint():
+    """Хэш исходников всех загруженных модулей репозитория.
+
+    Считается один раз на набор загруженных модулей: долгоживущий процесс
+    (воркер automata.service) продолжает подписывать результаты тем кодом,
+    который он загрузил, даже если файлы на диске уже изменились.
+    """
+    paths = tuple(sorted({
+        os.path.abspath(module.__file__) for module in list(sys.modules.values())
+        if getattr(module, '__file__', None) and os.path.abspath(module.__file__).startswith(ROOT + os.sep)
+    }))
+    if paths not in _fingerprints:
+        digest = hashlib.sha256()
+        for path in paths:
+            digest.update(path[len(ROOT):].encode('utf-8'))
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        _fingerprints[paths] = digest.hexdigest()
+    return _fingerprints[paths]
+
+
+class ResultCache:
+    """Записи кэша в каталоге directory/entries/<2 символа ключа>/<ключ>.entry"""
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = directory or default_directory()
+        if max_bytes is None:
+            size = os.environ.get(SIZE_VARIABLE)
+            max_bytes = parse_size(size) if size else DEFAULT_MAX_BYTES
+        self.max_bytes = max_bytes
+        self.entries = os.path.join(self.directory, 'entries')
+
+    def key(self, operation, input_file, *params):
+        """Ключ записи или None, если вход не файл (stdin) и кэшировать нечего"""
+        if input_file == STDIO_PATH or not os.path.isfile(input_file):
+            return None
+        digest = hashlib.sha256()
+        digest.update(json.dumps([operation, *map(str, params)]).encode('utf-8'))
+        digest.update(b'\0')
+        with open(input_file, 'rb') as f:
+            for chunk in iter(lambda: f.read(READ_CHUNK), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.entries, key[:2], key + ENTRY_SUFFIX)
+
+    def lookup(self, key, output_file):
+        """Копирует выходной файл записи в output_file; текст stdout или None"""
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as entry:
+                magic, stdout_size = ENTRY_HEADER.unpack(entry.read(ENTRY_HEADER.size))
+                if magic != MAGIC:
+                    raise ValueError(path)
+                stdout = entry.read(stdout_size).decode('utf-8')
+                os.utime(path)
+                # Выход копируется блоками: запись может быть больше памяти процесса
+                with open(output_file, 'wb') as f:
+                    shutil.copyfileobj(entry, f, READ_CHUNK)
+        except (OSError, ValueError, struct.error):
+            self.record('misses')
+            return None
+        self.record('hits')
+        return stdout
+
+    def store(self, key, output_file, stdout):
+        """Сохраняет output_file и stdout; запись больше max_bytes не сохраняется"""
+        stdout = stdout.encode('utf-8')
+        path = self.path(key)
+        try:
+            # Иначе новая запись вытеснила бы все остальные, а затем и себя
+            if ENTRY_HEADER.size + len(stdout) + os.path.getsize(output_file) > self.max_bytes:
+                return
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Запись через временный файл: параллельный читатель не увидит половину
+            fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f, open(output_file, 'rb') as output:
+                    f.write(ENTRY_HEADER.pack(MAGIC, len(stdout)))
+                    f.write(stdout)
+                    shutil.copyfileobj(output, f, READ_CHUNK)
+                os.replace(temporary, path)
+            except OSError:
+                os.remove(temporary)
+                raise
+            self.evict()
+        except OSError:
+            pass
+
+    def scan(self):
+        """(время последнего использования, размер, путь) всех записей"""
+        found = []
+        if not os.path.isdir(self.entries):
+            return found
+        for shard in os.scandir(self.entries):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(ENTRY_SUFFIX):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    found.append((stat.st_mtime, stat.st_size, entry.path))
+        return found
+
+    def evict(self):
+        """Удаляет давно не использованные записи, пока кэш больше max_bytes"""
+        entries = self.scan()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return 0
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+    def record(self, counter):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, counter), 'ab') as f:
+                f.write(b'.')
+        except OSError:
+            pass
+
+    def counter(self, name):
+        try:
+            return os.path.getsize(os.path.join(self.directory, name))
+        except OSError:
+            return 0
+
+    def stats(self):
+        entries = self.scan()
+        hits, misses = self.counter('hits'), self.counter('misses')
+        return {
+            'directory': self.directory,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / (hits + misses) if hits + misses else None,
+            'oldest_use': min((used for used, _, _ in entries), default=None),
+            'newest_use': max((used for used, _, _ in entries), default=None),
+        }
+
+    def clear(self):
+        removed = 0
+        for _, _, path in self.scan():
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        for counter in ('hits', 'misses'):
+            try:
+                os.remove(os.path.join(self.directory, counter))
+            except FileNotFoundError:
+                pass
+        return removed
+
+
+class Tee(io.TextIOBase):
+    """stdout, который ещё и запоминает напечатанное"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.parts = []
+
+    def write(self, text):
+        self.parts.append(text)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def getvalue(self):
+        return ''.join(self.parts)
+
+
+def run_cached(cache, run, operation, input_file, output_file, *params, metrics=None):
+    """Вызывает run(), который пишет output_file и печатает в stdout, через кэш.
+
+    При попадании выходной файл и stdout восстанавливаются из записи и run
+    не вызывается. Если run() вернул False (ошибка, выход не записан),
+    результат не кэшируется. Возвращает то, что вернул run, или True при
+    попадании.
+    """
+    key = None
+    if cache is not None and output_file != STDIO_PATH:
+        with phase(metrics, 'cache'):
+            key = cache.key(operation, input_file, binary.is_binary_path(output_file),
+                            metrics_module.verbosity, source_fingerprint(), *params)
+            stdout = cache.lookup(key, output_file) if key is not None else None
+        if stdout is not None:
+            sys.stdout.write(stdout)
+            if metrics is not None:
+                metrics.count('cache_hits')
+            return True
+
+    if key is None:
+        return run()
+
+    stdout, tee = sys.stdout, Tee(sys.stdout)
+    sys.stdout = tee
+    try:
+        result = run()
+    finally:
+        sys.stdout = stdout
+    if result is not False:
+        with phase(metrics, 'cache'):
+            cache.store(key, output_file, tee.getvalue())
+    if metrics is not None:
+        metrics.count('cache_misses')
+    return result
+
+
+def add_cache_arguments(parser):
+    group = parser.add_argument_group("cache")
+    group.add_argument('--no-cache', action='store_true', help="не читать и не пополнять кэш результатов")
+    group.add_argument('--cache-dir', help=f"каталог кэша (по умолчанию ${DIR_VARIABLE} или ~/.cache/automata)")
+
+
+def split_cache_arguments(argv):
+    """Для инструментов с ручным разбором argv: опции кэша и остальные аргументы"""
+    parser = argparse.ArgumentParser(add_help=False)
+    add_cache_arguments(parser)
+    return parser.parse_known_args(argv)
+
+
+def cache_from_args(args):
+    if args.no_cache or os.environ.get(DISABLE_VARIABLE):
+        return None
+    return ResultCache(args.cache_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Кэш результатов инструментов лабораторных")
+    parser.add_argument('--cache-dir', help=f"каталог кэша (по умолчанию ${DIR_VARIABLE} или ~/.cache/automata)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    stats = subparsers.add_parser('stats', help="размер, число записей и доля попаданий")
+    stats.add_argument('--json', action='store_true', help="вывести JSON")
+    subparsers.add_parser('clear', help="удалить все записи и счётчики")
+    args = parser.parse_args()
+
+    cache = ResultCache(args.cache_dir)
+    if args.command == 'clear':
+        print(f"removed {cache.clear()} entries from {cache.directory}")
+        return
+
+    stats = cache.stats()
+    if args.json:
+        print(json.dumps(stats, indent=2))
+        return
+    print(f"directory: {stats['directory']}")
+    print(f"entries: {stats['entries']}, size: {stats['bytes']} of {stats['max_bytes']} bytes")
+    rate = f"{stats['hit_rate']:.1%}" if stats['hit_rate'] is not None else "n/a"
+    print(f"hits: {stats['hits']}, misses: {stats['misses']}, hit rate: {rate}")
+    if stats['entries']:
+        print(f"least recently used: {time.ctime(stats['oldest_use'])}, "
+              f"most recently used: {time.ctime(stats['newest_use'])}")
+
+
+if __name__ == "__main__":
+    main()
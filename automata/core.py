@@ -0,0 +1,292 @@
+"""Общее ядро автоматов: состояния и символы пронумерованы, переходы лежат в array('i').
+
+Раскладка таблиц та же, что у CSV и двоичного формата: ячейка (вход i,
+состояние j) имеет индекс i * num_states + j. Состояния 0..num_states-1 —
+столбцы таблицы; имена после них — цели переходов без собственного
+столбца (в CSV такие встречаются, например «q1,q2» в ДКА или имя с опечаткой).
+Пустая ячейка — NO_STATE.
+"""
+import sys
+from array import array
+
+NO_STATE = -1
+EPSILON = 'ε'
+
+
+class Interner(dict):
+    """Номера строк в порядке первого появления; сами строки — в names"""
+
+    def __init__(self, names=()):
+        super().__init__()
+        self.names = []
+        for name in names:
+            self[name]
+
+    def __missing__(self, name):
+        index = self[name] = len(self.names)
+        self.names.append(name)
+        return index
+
+
+class StateIds(Interner):
+    """Номера состояний: столбец — по первому вхождению имени, остальные имена — в конец"""
+
+    def __init__(self, columns):
+        super().__init__()
+        self.names = list(columns)
+        for index, name in enumerate(self.names):
+            self.setdefault(name, index)
+
+
+def padded_cells(row, width):
+    cells = row[1:width + 1]
+    cells.extend([''] * (width - len(cells)))
+    return cells
+
+
+class Automaton:
+    """Общая часть ДКА и НКА: имена состояний, входов и выходов состояний.
+
+    outputs[j] — номер выхода состояния j в output_names (для автомата Мура
+    это выходной символ, для НКА/ДКА из детерминизации — 'F' или '').
+    """
+
+    __slots__ = ('state_names', 'num_states', 'input_names', 'output_names', 'outputs')
+
+    def __init__(self, state_names, num_states, input_names, output_names, outputs):
+        self.state_names = state_names
+        self.num_states = num_states
+        self.input_names = input_names
+        self.output_names = output_names
+        self.outputs = outputs
+
+    @property
+    def num_inputs(self):
+        return len(self.input_names)
+
+    def state_output(self, state):
+        return self.output_names[self.outputs[state]]
+
+    def input_ids(self):
+        ids = {}
+        for index, name in enumerate(self.input_names):
+            ids.setdefault(name, index)
+        return ids
+
+    def nbytes(self):
+        """Память под массивы и списки имён (сами строки не считаются)"""
+        total = sum(sys.getsizeof(names) for names in (self.state_names, self.input_names, self.output_names))
+        return total + sum(sys.getsizeof(getattr(self, slot)) for slot in self.array_slots())
+
+    def array_slots(self):
+        return ('outputs',)
+
+
+class DFA(Automaton):
+    """Детерминированный автомат: table[i * num_states + j] — цель или NO_STATE.
+
+    У автомата Мили transition_outputs той же формы хранит номера выходов
+    переходов в output_names, у автомата Мура он равен None.
+    """
+
+    __slots__ = ('table', 'transition_outputs')
+
+    def __init__(self, state_names, num_states, input_names, output_names, outputs, table,
+                 transition_outputs=None):
+        super().__init__(state_names, num_states, input_names, output_names, outputs)
+        self.table = table
+        self.transition_outputs = transition_outputs
+
+    @property
+    def is_mealy(self):
+        return self.transition_outputs is not None
+
+    def target(self, state, symbol):
+        return self.table[symbol * self.num_states + state]
+
+    def row(self, state):
+        """Цели состояния по всем входам"""
+        return self.table[state::self.num_states]
+
+    def array_slots(self):
+        return ('outputs', 'table') + (('transition_outputs',) if self.is_mealy else ())
+
+    def select_inputs(self, inputs):
+        """ДКА только с входами из списка номеров inputs, в их порядке"""
+        width = self.num_states
+        table = array('i')
+        transition_outputs = array('i') if self.is_mealy else None
+        for i in inputs:
+            table.extend(self.table[i * width:(i + 1) * width])
+            if transition_outputs is not None:
+                transition_outputs.extend(self.transition_outputs[i * width:(i + 1) * width])
+        return DFA(self.state_names, width, [self.input_names[i] for i in inputs], self.output_names,
+                   self.outputs, table, transition_outputs)
+
+    @classmethod
+    def from_moore(cls, state_names, output_symbols, rows):
+        """Автомат Мура из разобранного CSV: строки — [вход, цель, цель, ...]"""
+        width = len(state_names)
+        ids = StateIds(state_names)
+        outputs = Interner()
+        output_ids = array('i', map(outputs.__getitem__, padded_cells([''] + list(output_symbols), width)))
+        input_names = []
+        table = array('i')
+        for row in rows:
+            if not row:
+                continue
+            input_names.append(row[0])
+            table.extend([ids[cell] if cell else NO_STATE for cell in padded_cells(row, width)])
+        return cls(ids.names, width, input_names, outputs.names, output_ids, table)
+
+    @classmethod
+    def from_mealy(cls, state_names, rows):
+        """Автомат Мили из разобранного CSV: ячейки «цель/выход», ячейка без «/» — пустой выход"""
+        width = len(state_names)
+        ids = StateIds(state_names)
+        outputs = Interner([''])
+        input_names = []
+        table = array('i')
+        transition_outputs = array('i')
+        for row in rows:
+            if not row:
+                continue
+            input_names.append(row[0])
+            for cell in padded_cells(row, width):
+                target, _, output = cell.partition('/')
+                table.append(ids[target] if cell else NO_STATE)
+                transition_outputs.append(outputs[output])
+        return cls(ids.names, width, input_names, outputs.names, array('i', [0] * width), table,
+                   transition_outputs)
+
+    @classmethod
+    def from_binary(cls, automaton):
+        """ДКА из binary.BinaryAutomaton; массивы копируются одним memcpy, без разбора строк"""
+        from automata import binary
+
+        if automaton.multi:
+            rows = automaton.iter_rows()
+            outputs = next(rows)[1:]
+            return cls.from_moore(next(rows)[1:], outputs, rows)
+
+        strings = automaton.strings
+        names = automaton.state_names()
+        input_names = automaton.input_names()
+        table = array('i', automaton.targets)
+        if automaton.kind == binary.KIND_MOORE:
+            return cls(names, automaton.num_states, input_names, strings, array('i', automaton.outputs), table)
+
+        # Ячейка без «/» в CSV читается как пустой выход — так же и здесь
+        output_names = list(strings)
+        empty = output_names.index('') if '' in output_names else len(output_names)
+        if empty == len(output_names):
+            output_names.append('')
+        transition_outputs = array('i', automaton.cell_outputs)
+        if NO_STATE in transition_outputs:
+            transition_outputs = array('i', [empty if o == NO_STATE else o for o in transition_outputs])
+        return cls(names, automaton.num_states, input_names, output_names,
+                   array('i', [empty] * automaton.num_states), table, transition_outputs)
+
+
+class NFA(Automaton):
+    """Недетерминированный автомат в CSR: цели ячейки c — targets[offsets[c]:offsets[c + 1]].
+
+    ε-переходы — обычный вход с именем EPSILON; повторяющиеся строки входов
+    при загрузке сливаются, как в determination.read_nfa.
+    """
+
+    __slots__ = ('offsets', 'targets')
+
+    def __init__(self, state_names, num_states, input_names, output_names, outputs, offsets, targets):
+        super().__init__(state_names, num_states, input_names, output_names, outputs)
+        self.offsets = offsets
+        self.targets = targets
+
+    def successors(self, state, symbol):
+        cell = symbol * self.num_states + state
+        return self.targets[self.offsets[cell]:self.offsets[cell + 1]]
+
+    def array_slots(self):
+        return ('outputs', 'offsets', 'targets')
+
+    @classmethod
+    def from_table(cls, state_names, output_symbols, rows):
+        """НКА из пар (вход, списки имён целей по столбцам)"""
+        width = len(state_names)
+        ids = StateIds(state_names)
+        outputs = Interner()
+        output_ids = array('i', map(outputs.__getitem__, padded_cells([''] + list(output_symbols), width)))
+
+        input_rows = {}
+        for symbol, cells in rows:
+            merged = input_rows.get(symbol)
+            if merged is None:
+                input_rows[symbol] = [[ids[target] for target in cell] for cell in cells[:width]] + \
+                    [[] for _ in range(width - len(cells))]
+            else:
+                for cell, targets in zip(merged, cells):
+                    cell.extend(ids[target] for target in targets)
+
+        offsets = array('i', [0])
+        targets = array('i')
+        for cells in input_rows.values():
+            for cell in cells:
+                targets.extend(cell)
+                offsets.append(len(targets))
+        return cls(ids.names, width, list(input_rows), outputs.names, output_ids, offsets, targets)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """НКА из строк CSV: выходы, имена состояний и строки «вход;q1,q2;...»"""
+        rows = iter(rows)
+        output_symbols = next(rows)[1:]
+        state_names = next(rows)[1:]
+        return cls.from_table(state_names, output_symbols, (
+            (row[0], [cell.split(',') if cell else [] for cell in row[1:]]) for row in rows if row
+        ))
+
+    @classmethod
+    def from_binary(cls, automaton):
+        inputs = automaton.input_names()
+        if len(set(inputs)) != len(inputs):
+            return cls.from_rows(automaton.iter_rows())
+        if automaton.multi:
+            offsets = array('i', automaton.cell_offsets)
+            targets = array('i', automaton.targets)
+        else:
+            # Таблица с одной целью в ячейке: пустые ячейки выпадают из CSR
+            offsets = array('i', [0])
+            targets = array('i')
+            for target in automaton.targets.tolist():
+                if target != NO_STATE:
+                    targets.append(target)
+                offsets.append(len(targets))
+        return cls(automaton.state_names(), automaton.num_states, inputs, automaton.strings,
+                   array('i', automaton.outputs), offsets, targets)
+
+
+class DFABuilder:
+    """Собирает ДКА по одному состоянию: переходы копятся по столбцам входов"""
+
+    __slots__ = ('input_names', 'columns', 'state_names', 'outputs', 'output_ids')
+
+    def __init__(self, input_names, output_names=('',)):
+        self.input_names = list(input_names)
+        self.columns = [array('i') for _ in self.input_names]
+        self.state_names = []
+        self.outputs = array('i')
+        self.output_ids = Interner(output_names)
+
+    def add_state(self, name, output, targets):
+        """targets — цель (номер состояния или NO_STATE) по каждому входу"""
+        self.state_names.append(name)
+        self.outputs.append(self.output_ids[output])
+        for column, target in zip(self.columns, targets):
+            column.append(target)
+
+    def build(self):
+        table = array('i')
+        for column in self.columns:
+            table.extend(column)
+        return DFA(self.state_names, len(self.state_names), self.input_names, self.output_ids.names,
+                   self.outputs, table)
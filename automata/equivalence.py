@@ -0,0 +1,281 @@
+"""Проверка эквивалентности ДКА и автоматов Мили/Мура (Хопкрофт — Карп).
+
+Пары состояний (p, q) обходятся в ширину от пары начальных состояний, а
+объединение и поиск по общему лесу состояний обоих автоматов отсекают
+пары, эквивалентность которых уже предположена. Получается почти линейное
+время: O((n1 + n2) · |Σ| · α(n)). Если автоматы различаются, кратчайшее
+различающее слово ищет второй обход в ширину по парам, уже без
+объединения: он останавливается на первом уровне с расхождением.
+
+Сравниваются:
+  - два автомата Мура (и ДКА из детерминизации) — выходы состояний,
+    включая начальное (пустое слово);
+  - автомат Мили с любым — выходы переходов; у автомата Мура выход
+    перехода — выход состояния, в которое он ведёт (как в simulator).
+С accepting сравниваются только языки: выход — «финальное или нет».
+
+Входы берутся объединением алфавитов. Неопределённый переход, вход,
+которого нет у автомата, и цель без столбца ведут в поглощающий сток без
+выхода (None); в режиме accepting сток не финальный, так что явное
+мёртвое состояние и пустая ячейка не различаются.
+
+    python -m automata.equivalence first.csv second.csv [--accept F]
+    python -m automata.equivalence --differential nfa.csv [--tools determination,d1,d2]
+"""
+import os
+import sys
+import argparse
+import subprocess
+import tempfile
+from collections import deque
+from array import array
+
+from automata import labs
+from automata.core import Interner
+from automata.cache import DISABLE_VARIABLE
+from automata.simulator import read_machine
+
+SINK_OUTPUT = -1
+ACCEPTING_OUTPUTS = ('F',)
+# Детерминизаторы лабораторной 3: имя → скрипт
+DETERMINIZERS = {
+    'determination': os.path.join(labs.ROOT, "Lab3 (Determination)", "determination.py"),
+    'd1': os.path.join(labs.ROOT, "Lab3 (Determination)", "d1.py"),
+    'd2': os.path.join(labs.ROOT, "Lab3 (Determination)", "d2.py"),
+}
+
+
+def input_alphabet(first, second):
+    """Объединение алфавитов: входы первого автомата, затем недостающие второго"""
+    names = list(first.input_ids())
+    seen = set(names)
+    names.extend(name for name in second.input_ids() if name not in seen)
+    return names
+
+
+class MachineView:
+    """Переходы и выходы одного автомата по общему алфавиту; состояние num_states — сток"""
+
+    def __init__(self, machine, alphabet, output_ids, mealy_mode, accepting=None):
+        width = machine.num_states
+        self.sink = width
+        self.start = 0 if width else self.sink
+        ids = machine.input_ids()
+
+        def output_id(name):
+            if accepting is not None:
+                return int(name in accepting)
+            return output_ids[name]
+
+        sink_output = 0 if accepting is not None else SINK_OUTPUT
+        state_outputs = array('i', [output_id(machine.state_output(state)) for state in range(width)])
+        state_outputs.append(sink_output)
+
+        self.targets = []
+        self.transition_outputs = [] if mealy_mode else None
+        for name in alphabet:
+            symbol = ids.get(name)
+            if symbol is None:
+                targets = array('i', [self.sink]) * (width + 1)
+            else:
+                targets = array('i', machine.table[symbol * width:(symbol + 1) * width])
+                targets.append(self.sink)
+            if mealy_mode:
+                if machine.is_mealy and symbol is not None:
+                    names = machine.output_names
+                    outputs = array('i', [
+                        output_id(names[machine.transition_outputs[symbol * width + state]])
+                        if 0 <= targets[state] else sink_output
+                        for state in range(width)
+                    ])
+                    outputs.append(sink_output)
+                else:
+                    outputs = array('i', [state_outputs[target] if 0 <= target < width else sink_output
+                                          for target in targets])
+                self.transition_outputs.append(outputs)
+            self.targets.append(array('i', [target if 0 <= target < width else self.sink for target in targets]))
+        self.state_outputs = None if mealy_mode else state_outputs
+
+
+def machine_views(first, second, accepting=None):
+    alphabet = input_alphabet(first, second)
+    mealy_mode = first.is_mealy or second.is_mealy
+    output_ids = Interner()
+    return (alphabet,
+            MachineView(first, alphabet, output_ids, mealy_mode, accepting),
+            MachineView(second, alphabet, output_ids, mealy_mode, accepting),
+            output_ids)
+
+
+def find(parent, node):
+    while parent[node] != node:
+        parent[node] = parent[parent[node]]
+        node = parent[node]
+    return node
+
+
+def equivalent(first, second, accepting=None):
+    """Эквивалентны ли автоматы (Хопкрофт — Карп)"""
+    _, a, b, _ = machine_views(first, second, accepting)
+    return hopcroft_karp(a, b)
+
+
+def hopcroft_karp(a, b):
+    # Узлы леса: состояния a, затем состояния b со сдвигом offset
+    offset = a.sink + 1
+    parent = array('i', range(offset + b.sink + 1))
+    parent[offset + b.start] = a.start
+    queue = deque([(a.start, b.start)])
+    symbols = range(len(a.targets))
+    while queue:
+        p, q = queue.popleft()
+        if a.state_outputs is not None and a.state_outputs[p] != b.state_outputs[q]:
+            return False
+        for symbol in symbols:
+            if a.transition_outputs is not None and \
+                    a.transition_outputs[symbol][p] != b.transition_outputs[symbol][q]:
+                return False
+            p_next, q_next = a.targets[symbol][p], b.targets[symbol][q]
+            root_p, root_q = find(parent, p_next), find(parent, offset + q_next)
+            if root_p != root_q:
+                parent[root_q] = root_p
+                queue.append((p_next, q_next))
+    return True
+
+
+def shortest_counterexample(a, b):
+    """(номера входов слова, выход a, выход b) для первого расхождения в ширину или None"""
+    parents = {(a.start, b.start): None}
+    queue = deque([(a.start, b.start)])
+    symbols = range(len(a.targets))
+
+    def word(pair, last=None):
+        symbols_back = [] if last is None else [last]
+        while parents[pair] is not None:
+            pair, symbol = parents[pair]
+            symbols_back.append(symbol)
+        return symbols_back[::-1]
+
+    while queue:
+        pair = queue.popleft()
+        p, q = pair
+        if a.state_outputs is not None and a.state_outputs[p] != b.state_outputs[q]:
+            return word(pair), a.state_outputs[p], b.state_outputs[q]
+        for symbol in symbols:
+            if a.transition_outputs is not None:
+                output_a, output_b = a.transition_outputs[symbol][p], b.transition_outputs[symbol][q]
+                if output_a != output_b:
+                    return word(pair, symbol), output_a, output_b
+            following = (a.targets[symbol][p], b.targets[symbol][q])
+            if following not in parents:
+                parents[following] = (pair, symbol)
+                queue.append(following)
+    return None
+
+
+def counterexample(first, second, accepting=None):
+    """None, если автоматы эквивалентны, иначе (кратчайшее слово, выход первого, выход второго).
+
+    Слово — список имён входов. Выход — имя выхода на последнем шаге,
+    None у стока, а с accepting — True/False (финальность).
+    """
+    alphabet, a, b, output_ids = machine_views(first, second, accepting)
+    if hopcroft_karp(a, b):
+        return None
+    symbols, output_a, output_b = shortest_counterexample(a, b)
+
+    def name(output):
+        if accepting is not None:
+            return bool(output)
+        return None if output == SINK_OUTPUT else output_ids.names[output]
+
+    return [alphabet[symbol] for symbol in symbols], name(output_a), name(output_b)
+
+
+def describe(result):
+    if result is None:
+        return "equivalent"
+    word, first_output, second_output = result
+    shown = ' '.join(word) if word else 'ε'
+    return f"not equivalent: on '{shown}' first gives {first_output!r}, second gives {second_output!r}"
+
+
+def read_dfa(path):
+    machine = read_machine(path)
+    if any(',' in name for name in machine.state_names[machine.num_states:]):
+        raise ValueError(f"{path}: table is nondeterministic, run determination.py first")
+    return machine
+
+
+def run_determinizer(name, input_file, output_file):
+    env = dict(os.environ)
+    # Дифференциальная проверка должна запускать сам алгоритм, а не читать кэш
+    env[DISABLE_VARIABLE] = '1'
+    completed = subprocess.run([sys.executable, DETERMINIZERS[name], os.path.abspath(input_file), output_file],
+                               cwd=os.path.dirname(DETERMINIZERS[name]), env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if completed.returncode:
+        messages = completed.stderr.strip().splitlines()
+        raise ValueError(f"{name} failed: {messages[-1] if messages else completed.returncode}")
+
+
+def differential(input_file, tools, accepting=ACCEPTING_OUTPUTS):
+    """Запускает детерминизаторы на одном НКА и сравнивает их ДКА с первым из tools.
+
+    Возвращает список (инструмент, результат counterexample или текст ошибки).
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        machines = {}
+        for tool in tools:
+            output_file = os.path.join(workdir, f"{tool}.csv")
+            try:
+                run_determinizer(tool, input_file, output_file)
+                machines[tool] = read_dfa(output_file)
+            except ValueError as error:
+                results.append((tool, str(error)))
+        reference = tools[0]
+        if reference in machines:
+            for tool in tools[1:]:
+                if tool in machines:
+                    results.append((tool, counterexample(machines[reference], machines[tool], accepting)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Эквивалентность ДКА и автоматов Мили/Мура")
+    parser.add_argument('files', nargs='+', help="два автомата (CSV или .autb) или НКА с --differential")
+    parser.add_argument('--accept', action='append',
+                        help="сравнивать языки: выходы финальных состояний (повторяемый)")
+    parser.add_argument('--differential', action='store_true',
+                        help="запустить детерминизаторы на НКА и сравнить их ДКА")
+    parser.add_argument('--tools', default=','.join(DETERMINIZERS),
+                        help=f"детерминизаторы через запятую, первый — эталон (по умолчанию {','.join(DETERMINIZERS)})")
+    args = parser.parse_args()
+
+    if args.differential:
+        tools = [tool for tool in args.tools.split(',') if tool]
+        unknown = [tool for tool in tools if tool not in DETERMINIZERS]
+        if len(args.files) != 1 or len(tools) < 2 or unknown:
+            parser.error("--differential takes one NFA file and at least two known --tools")
+        different = False
+        for tool, result in differential(args.files[0], tools, tuple(args.accept or ACCEPTING_OUTPUTS)):
+            text = result if isinstance(result, str) else describe(result)
+            print(f"{tools[0]} vs {tool}: {text}")
+            different = different or result is not None
+        sys.exit(1 if different else 0)
+
+    if len(args.files) != 2:
+        parser.error("expected two automata")
+    try:
+        first, second = (read_dfa(path) for path in args.files)
+    except ValueError as error:
+        print(f"Error: {error}")
+        sys.exit(2)
+    result = counterexample(first, second, tuple(args.accept) if args.accept else None)
+    print(describe(result))
+    sys.exit(0 if result is None else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Случайные автоматы и грамматики в форматах лабораторных.
+
+Все генераторы детерминированы: одинаковые параметры и seed дают один и
+тот же файл. Таблицы возвращаются строками в том виде, в каком их читает
+csv.reader, и пишутся binary.write_csv_rows (или binary.write_rows для .autb).
+"""
+import random
+
+from automata.core import EPSILON
+
+
+def names(prefix, count):
+    return [f"{prefix}{i}" for i in range(count)]
+
+
+def mealy_rows(states, inputs=2, outputs=2, seed=0):
+    """Автомат Мили: заголовок состояний и строки «вход;цель/выход;...»"""
+    rng = random.Random(seed)
+    state_names = names('a', states)
+    output_names = names('w', outputs)
+    rows = [[''] + state_names]
+    for symbol in names('z', inputs):
+        rows.append([symbol] + [f"{rng.choice(state_names)}/{rng.choice(output_names)}" for _ in state_names])
+    return rows
+
+
+def moore_rows(states, inputs=2, outputs=2, seed=0):
+    """Автомат Мура: строка выходов, заголовок состояний и строки «вход;цель;...»"""
+    rng = random.Random(seed)
+    state_names = names('q', states)
+    output_names = names('y', outputs)
+    rows = [[''] + [rng.choice(output_names) for _ in state_names], [''] + state_names]
+    for symbol in names('x', inputs):
+        rows.append([symbol] + [rng.choice(state_names) for _ in state_names])
+    return rows
+
+
+def sample_targets(rng, state_names, density):
+    """Случайное множество целей, в среднем density штук"""
+    count = int(density) + (rng.random() < density - int(density))
+    return rng.sample(state_names, min(count, len(state_names)))
+
+
+def nfa_rows(states, symbols=2, density=1.5, epsilon=0.2, final=0.2, seed=0):
+    """НКА в формате determination.py.
+
+    density — среднее число целей в ячейке по обычному символу, epsilon —
+    по ε (0 — без строки ε), final — доля финальных состояний.
+    """
+    rng = random.Random(seed)
+    state_names = names('X', states)
+    rows = [[''] + ['F' if rng.random() < final else '' for _ in state_names], [''] + state_names]
+    inputs = [(symbol, density) for symbol in names('s', symbols)]
+    if epsilon:
+        inputs.append((EPSILON, epsilon))
+    for symbol, symbol_density in inputs:
+        rows.append([symbol] + [','.join(sample_targets(rng, state_names, symbol_density)) for _ in state_names])
+    return rows
+
+
+def blowup_nfa_rows(k, epsilon=False):
+    """НКА языка (a|b)*a(a|b)^k: k + 2 состояния, у минимального ДКА 2^(k+1).
+
+    При epsilon=True добавляется ε-переход из финального состояния в
+    начальное: язык становится итерацией исходного, а ДКА — строится через
+    ε-замыкания.
+    """
+    state_names = names('X', k + 2)
+    rows = [[''] + [''] * (k + 1) + ['F'], [''] + state_names]
+    a_row = ['a', 'X0,X1'] + [state_names[i + 1] for i in range(1, k + 1)] + ['']
+    b_row = ['b', 'X0'] + [state_names[i + 1] for i in range(1, k + 1)] + ['']
+    rows += [a_row, b_row]
+    if epsilon:
+        rows.append([EPSILON] + [''] * (k + 1) + ['X0'])
+    return rows
+
+
+def grammar_lines(nonterminals, terminals=2, alternatives=3, left=False, seed=0):
+    """Праволинейная (left=False) или леволинейная грамматика, первая строка — аксиома.
+
+    У каждого нетерминала alternatives альтернатив; одна из них и ещё
+    примерно каждая четвёртая — из одного терминала, чтобы язык не был пустым.
+    """
+    rng = random.Random(seed)
+    nonterminal_names = [f"<N{i}>" for i in range(nonterminals)]
+    terminal_names = names('t', terminals)
+    lines = []
+    for lhs in nonterminal_names:
+        alts = []
+        for index in range(alternatives):
+            terminal = rng.choice(terminal_names)
+            if index == 0 or rng.random() < 0.25:
+                alts.append(terminal)
+            elif left:
+                alts.append(f"{rng.choice(nonterminal_names)} {terminal}")
+            else:
+                alts.append(f"{terminal} {rng.choice(nonterminal_names)}")
+        rng.shuffle(alts)
+        lines.append(f"{lhs} -> {' | '.join(alts)}")
+    return lines
+
+
+def write_grammar(path, lines):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
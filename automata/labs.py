@@ -0,0 +1,16 @@
+"""Подключает папки лабораторных к sys.path, чтобы их модули импортировались по имени"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAB_DIRS = (
+    "Lab1_Mealy-Moore",
+    "Lab2 Minimization",
+    "Lab3 (Determination)",
+    "Lab4 (Grammar)",
+)
+
+for lab_dir in LAB_DIRS:
+    path = os.path.join(ROOT, lab_dir)
+    if path not in sys.path:
+        sys.path.append(path)
@@ -0,0 +1,449 @@
+"""Скомпилированный ДКА для сканирования текста: плотная таблица по классам символов.
+
+Компиляция берёт core.DFA (CSV из determination.py или Minimization.py,
+либо .autb) и строит:
+
+  - классы символов: байты и символы с одинаковыми столбцами переходов
+    объединяются, класс 0 — «перехода нет»;
+  - таблицу table[state * num_classes + class] → состояние;
+  - одно мёртвое состояние: в него сливаются пустые ячейки, цели без
+    столбца и все состояния, из которых финальное недостижимо, поэтому
+    сканирование останавливается, как только совпадение невозможно.
+
+Входной символ — один символ имени входа. bytes/bytearray/memoryview
+сканируются побайтно (байт b — символ chr(b)), str — по кодовым точкам.
+Байты переводятся в номера классов через bytes.translate, так что цикл
+Python делает одно обращение к таблице на байт. NumPy ускоряет то, что
+векторизуется: пакетную проверку многих строк (все строки шагают разом)
+и проверку длинного входа — блоки из k классов склеиваются в однобайтовые
+коды, и цикл делает один шаг по таблице блоков на k байт.
+
+    python -m automata.matcher dfa.csv match WORD...
+    python -m automata.matcher dfa.csv find FILE
+    python -m automata.matcher dfa.csv bench [--megabytes N] [--words N] [--json]
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import importlib.util
+from array import array
+
+from automata import binary
+from automata.core import DFA
+
+ACCEPTING_OUTPUTS = ('F',)
+DEAD_CLASS = 0
+BYTE_COUNT = 256
+# Проверка на мёртвое состояние — раз в блок, а не на каждом байте
+CHECK_BLOCK = 4096
+# Шаг на несколько классов сразу окупает склейку блоков только на длинном входе
+NUMPY_MIN_BYTES = 1 << 12
+STRIDE_MAX_CELLS = 1 << 20
+
+def read_dfa(path):
+    """core.DFA из CSV или двоичного файла (таблица Мура)"""
+    if binary.is_binary_file(path):
+        with binary.BinaryAutomaton(path) as automaton:
+            dfa = DFA.from_binary(automaton)
+    else:
+        rows = binary.read_csv_rows(path)
+        if binary.table_kind(rows) != binary.KIND_MOORE:
+            raise ValueError(f"{path}: Mealy table has no accepting states")
+        dfa = DFA.from_moore(rows[1][1:], rows[0][1:], rows[2:])
+    if dfa.is_mealy:
+        raise ValueError(f"{path}: Mealy table has no accepting states")
+    if any(',' in name for name in dfa.state_names[dfa.num_states:]):
+        raise ValueError(f"{path}: table is nondeterministic, run determination.py first")
+    return dfa
+
+
+def numpy_available():
+    return importlib.util.find_spec('numpy') is not None
+
+
+def live_states(dfa, accepting):
+    """Состояния, из которых достижимо финальное"""
+    width = dfa.num_states
+    predecessors = [[] for _ in range(width)]
+    table = dfa.table
+    for cell, target in enumerate(table):
+        if 0 <= target < width:
+            predecessors[target].append(cell % width)
+    live = [False] * width
+    stack = [state for state in range(width) if accepting[state]]
+    for state in stack:
+        live[state] = True
+    while stack:
+        for source in predecessors[stack.pop()]:
+            if not live[source]:
+                live[source] = True
+                stack.append(source)
+    return live
+
+
+class CompiledDFA:
+    """ДКА, готовый к сканированию; состояние dead поглощающее и не финальное"""
+
+    def __init__(self, dfa, accepting_outputs=ACCEPTING_OUTPUTS, use_numpy=None):
+        width = dfa.num_states
+        accepting_ids = {index for index, name in enumerate(dfa.output_names) if name in accepting_outputs}
+        original_accepting = [dfa.outputs[state] in accepting_ids for state in range(width)]
+        live = live_states(dfa, original_accepting)
+
+        # Живые состояния в исходном порядке, мёртвое — последним
+        renumber = [-1] * width
+        self.state_names = []
+        for state in range(width):
+            if live[state]:
+                renumber[state] = len(self.state_names)
+                self.state_names.append(dfa.state_names[state])
+        self.dead = len(self.state_names)
+        self.num_states = self.dead + 1
+        self.start = renumber[0] if width and live[0] else self.dead
+        self.accepting = bytearray(self.num_states)
+        for state in range(width):
+            if live[state] and original_accepting[state]:
+                self.accepting[renumber[state]] = 1
+
+        def column(symbol):
+            targets = dfa.table[symbol * width:(symbol + 1) * width]
+            return tuple(renumber[t] if 0 <= t < width and live[t] else self.dead
+                         for state, t in enumerate(targets) if live[state])
+
+        # Символы с байтовыми кодами нумеруются первыми, чтобы их классы
+        # поместились в таблицу bytes.translate
+        symbols = {}
+        for index, name in enumerate(dfa.input_names):
+            if len(name) != 1:
+                raise ValueError(f"Input symbol {name!r} is not a single character")
+            symbols.setdefault(ord(name), index)
+        dead_column = (self.dead,) * self.dead
+        class_ids = {dead_column: DEAD_CLASS}
+        columns = [dead_column]
+        code_class = {}
+        for code in sorted(symbols, key=lambda code: (code >= BYTE_COUNT, code)):
+            key = column(symbols[code])
+            class_id = class_ids.get(key)
+            if class_id is None:
+                class_id = class_ids[key] = len(columns)
+                columns.append(key)
+            code_class[code] = class_id
+
+        self.num_classes = len(columns)
+        self.byte_class = array('i', [code_class.get(code, DEAD_CLASS) for code in range(BYTE_COUNT)])
+        self.char_class = {code: class_id for code, class_id in code_class.items() if code >= BYTE_COUNT}
+        self.table = array('i', [self.dead]) * (self.num_states * self.num_classes)
+        for class_id, targets in enumerate(columns):
+            for state, target in enumerate(targets):
+                self.table[state * self.num_classes + class_id] = target
+        self.rows = [self.table[state * self.num_classes:(state + 1) * self.num_classes].tolist()
+                     for state in range(self.num_states)]
+        self.translation = bytes(self.byte_class.tolist()) if self.num_classes <= BYTE_COUNT else None
+        self.use_numpy = numpy_available() if use_numpy is None else use_numpy
+        self.numpy_tables = None
+        self.stride = None
+
+    @classmethod
+    def from_file(cls, path, accepting_outputs=ACCEPTING_OUTPUTS, use_numpy=None):
+        return cls(read_dfa(path), accepting_outputs, use_numpy)
+
+    def classes(self, data):
+        """Номера классов символов входа: bytes для байтовых входов, иначе list"""
+        if isinstance(data, str):
+            try:
+                data = data.encode('latin-1')
+            except UnicodeEncodeError:
+                byte_class = self.byte_class
+                char_class = self.char_class
+                return [byte_class[code] if code < BYTE_COUNT else char_class.get(code, DEAD_CLASS)
+                        for code in map(ord, data)]
+        if isinstance(data, memoryview) and (data.format != 'B' or data.ndim != 1):
+            data = data.cast('B')
+        if self.translation is None:
+            return [self.byte_class[byte] for byte in data]
+        return bytes(data).translate(self.translation)
+
+    def run(self, classes, state=None, rows=None):
+        """Состояние после чтения classes; останавливается в мёртвом состоянии"""
+        rows = self.rows if rows is None else rows
+        dead = self.dead
+        state = self.start if state is None else state
+        for block in range(0, len(classes), CHECK_BLOCK):
+            for class_id in classes[block:block + CHECK_BLOCK]:
+                state = rows[state][class_id]
+            if state == dead:
+                break
+        return state
+
+    def fullmatch(self, data):
+        """Принимает ли ДКА вход целиком"""
+        classes = self.classes(data)
+        if self.use_numpy and len(classes) >= NUMPY_MIN_BYTES:
+            return bool(self.accepting[self.numpy_run(classes)])
+        return bool(self.accepting[self.run(classes)])
+
+    def longest_prefix(self, classes, position=0):
+        """Конец самого длинного принятого префикса classes[position:] или -1"""
+        rows = self.rows
+        dead = self.dead
+        accepting = self.accepting
+        state = self.start
+        end = position if accepting[state] else -1
+        for index in range(position, len(classes)):
+            state = rows[state][classes[index]]
+            if state == dead:
+                break
+            if accepting[state]:
+                end = index + 1
+        return end
+
+    def match_prefix(self, data, position=0):
+        """Длина самого длинного принятого префикса data[position:] или -1"""
+        end = self.longest_prefix(self.classes(data), position)
+        return end - position if end >= 0 else -1
+
+    def iter_find(self, data):
+        """Непересекающиеся непустые совпадения (начало, конец): самое левое, затем самое длинное"""
+        classes = self.classes(data)
+        start_row = self.rows[self.start]
+        # Позиции, с которых совпадение может начаться, ищутся bytes.find
+        starters = None
+        if isinstance(classes, bytes):
+            starters = classes.translate(bytes(int(target != self.dead) for target in start_row)
+                                         + bytes(BYTE_COUNT - self.num_classes))
+        position = 0
+        while position < len(classes):
+            if starters is not None:
+                position = starters.find(1, position)
+                if position < 0:
+                    return
+            elif start_row[classes[position]] == self.dead:
+                position += 1
+                continue
+            end = self.longest_prefix(classes, position)
+            if end > position:
+                yield position, end
+                position = end
+            else:
+                position += 1
+
+    def find_all(self, data):
+        return list(self.iter_find(data))
+
+    # Векторизованные пути NumPy
+
+    def numpy_arrays(self):
+        """(плоская таблица, финальность) для NumPy"""
+        if self.numpy_tables is None:
+            import numpy as np
+
+            self.numpy_tables = (
+                np.asarray(self.table, dtype=np.int64),
+                np.frombuffer(bytes(self.accepting), dtype=np.uint8).astype(bool),
+            )
+        return self.numpy_tables
+
+    def stride_tables(self):
+        """(k, строки) для шага сразу на k классов: код блока c0..ck-1 — c0·C^(k-1) + ... + ck-1 < 256"""
+        if self.stride is None:
+            import numpy as np
+
+            stride = 1
+            while 1 < self.num_classes and self.num_classes ** (stride + 1) <= BYTE_COUNT:
+                stride += 1
+            if stride == 1 or self.num_states * self.num_classes ** stride > STRIDE_MAX_CELLS:
+                self.stride = (1, None)
+            else:
+                table = np.asarray(self.table, dtype=np.int32).reshape(self.num_states, self.num_classes)
+                blocks = table
+                for _ in range(stride - 1):
+                    blocks = table[blocks].reshape(self.num_states, -1)
+                self.stride = (stride, blocks.tolist())
+        return self.stride
+
+    def numpy_run(self, classes, state=None):
+        """run по k классов за шаг: NumPy склеивает блоки входа в однобайтовые коды"""
+        import numpy as np
+
+        stride, rows = self.stride_tables()
+        if rows is None or not isinstance(classes, bytes):
+            return self.run(classes, state)
+        codes = np.frombuffer(classes, dtype=np.uint8)
+        whole = len(codes) - len(codes) % stride
+        powers = self.num_classes ** np.arange(stride - 1, -1, -1, dtype=np.int32)
+        blocks = (codes[:whole].reshape(-1, stride).astype(np.int32) @ powers).astype(np.uint8).tobytes()
+        state = self.run(blocks, state, rows)
+        if state == self.dead:
+            return state
+        return self.run(classes[whole:], state)
+
+    def batch_classes(self, items):
+        """Пакет входов → список байтовых классов; None, если вход не байтовый"""
+        result = []
+        for item in items:
+            classes = self.classes(item)
+            if not isinstance(classes, bytes):
+                return None
+            result.append(classes)
+        return result
+
+    def numpy_batch(self, classes_list, track_ends=False):
+        """Конечные состояния (и концы самых длинных принятых префиксов) для пакета.
+
+        Строки сортируются по длине, и на шаге j шагают только строки длиннее
+        j — суффикс порядка, так что дополнять короткие строки не нужно.
+        """
+        import numpy as np
+
+        table, accepting = self.numpy_arrays()
+        count = len(classes_list)
+        lengths = np.fromiter(map(len, classes_list), dtype=np.int64, count=count)
+        offsets = np.zeros(count, dtype=np.int64)
+        np.cumsum(lengths[:-1], out=offsets[1:])
+        data = np.frombuffer(b''.join(classes_list), dtype=np.uint8)
+        order = np.argsort(lengths, kind='stable')
+        lengths, offsets = lengths[order], offsets[order]
+        width = int(lengths[-1]) if count else 0
+        first_active = np.searchsorted(lengths, np.arange(width), side='right')
+
+        states = np.full(count, self.start, dtype=np.int64)
+        ends = np.full(count, 0 if self.accepting[self.start] else -1, dtype=np.int64)
+        for step, active in enumerate(first_active.tolist()):
+            current = table[states[active:] * self.num_classes + data[offsets[active:] + step]]
+            states[active:] = current
+            if track_ends:
+                ends[active:][accepting[current]] = step + 1
+        finals = np.empty(count, dtype=np.int64)
+        finals[order] = states
+        result = np.empty(count, dtype=np.int64)
+        result[order] = ends
+        return finals, result
+
+    def match_many(self, items):
+        """fullmatch для каждого входа пакета"""
+        items = list(items)
+        classes_list = self.batch_classes(items) if self.use_numpy else None
+        if classes_list is None:
+            return [self.fullmatch(item) for item in items]
+        finals, _ = self.numpy_batch(classes_list)
+        return self.numpy_arrays()[1][finals].tolist()
+
+    def prefix_many(self, items):
+        """match_prefix для каждого входа пакета"""
+        items = list(items)
+        classes_list = self.batch_classes(items) if self.use_numpy else None
+        if classes_list is None:
+            return [self.match_prefix(item) for item in items]
+        _, ends = self.numpy_batch(classes_list, track_ends=True)
+        return ends.tolist()
+
+
+# Замер пропускной способности
+
+def random_walk(compiled, size, seed=0):
+    """Вход длины size, на котором ДКА не умирает: каждый байт ведёт в живое состояние"""
+    rng = random.Random(seed)
+    live_bytes = [[byte for byte in range(BYTE_COUNT)
+                   if compiled.rows[state][compiled.byte_class[byte]] != compiled.dead]
+                  for state in range(compiled.num_states)]
+    data = bytearray()
+    state = compiled.start
+    while len(data) < size and live_bytes[state]:
+        byte = rng.choice(live_bytes[state])
+        data.append(byte)
+        state = compiled.rows[state][compiled.byte_class[byte]]
+    return bytes(data)
+
+
+def throughput(function, data_bytes, repeat=3):
+    best = min(timed(function) for _ in range(repeat))
+    return data_bytes / best / 1e6 if best else float('inf')
+
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def benchmark(compiled, megabytes=1.0, words=10000, seed=0):
+    """MB/s для полного совпадения, префикса, поиска всех совпадений и пакета"""
+    data = random_walk(compiled, int(megabytes * (1 << 20)), seed)
+    rng = random.Random(seed)
+    alphabet = sorted({byte for byte in range(BYTE_COUNT) if compiled.byte_class[byte] != DEAD_CLASS})
+    noise = bytes(rng.choice(alphabet) for _ in range(len(data))) if alphabet else b''
+    batch = [data[offset:offset + rng.randint(1, 64)] for offset in rng.sample(range(max(len(data) - 64, 1)), words)] \
+        if data else []
+    batch_bytes = sum(map(len, batch))
+
+    classes = compiled.classes(data)
+    results = {
+        'states': compiled.num_states,
+        'classes': compiled.num_classes,
+        'input_bytes': len(data),
+        'fullmatch_python': throughput(lambda: compiled.run(classes), len(data)),
+        'translate': throughput(lambda: compiled.classes(data), len(data)),
+        'longest_prefix': throughput(lambda: compiled.match_prefix(data), len(data)),
+        'find_all_random': throughput(lambda: compiled.find_all(noise), len(noise)),
+    }
+    use_numpy = compiled.use_numpy
+    compiled.use_numpy = False
+    try:
+        results['batch_python'] = throughput(lambda: compiled.match_many(batch), batch_bytes)
+    finally:
+        compiled.use_numpy = use_numpy
+    if use_numpy:
+        if compiled.stride_tables()[1] is not None:
+            results['fullmatch_numpy'] = throughput(lambda: compiled.numpy_run(classes), len(data))
+        results['batch_numpy'] = throughput(lambda: compiled.match_many(batch), batch_bytes)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сканирование текста скомпилированным ДКА")
+    parser.add_argument('dfa', help="ДКА из determination.py или Minimization.py (CSV или .autb)")
+    parser.add_argument('--accept', action='append', help="выходы финальных состояний (по умолчанию F)")
+    parser.add_argument('--no-numpy', action='store_true', help="только циклы Python")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    match = subparsers.add_parser('match', help="проверить слова целиком")
+    match.add_argument('words', nargs='+')
+    find = subparsers.add_parser('find', help="найти все совпадения в файле")
+    find.add_argument('input', help="файл (\"-\" — stdin)")
+    bench = subparsers.add_parser('bench', help="пропускная способность в MB/s")
+    bench.add_argument('--megabytes', type=float, default=1.0)
+    bench.add_argument('--words', type=int, default=10000, help="строк в пакете")
+    bench.add_argument('--seed', type=int, default=0)
+    bench.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    try:
+        compiled = CompiledDFA.from_file(args.dfa, tuple(args.accept or ACCEPTING_OUTPUTS),
+                                         False if args.no_numpy else None)
+    except ValueError as error:
+        print(f"Error: {error}")
+        sys.exit(1)
+
+    if args.command == 'match':
+        for word, accepted in zip(args.words, compiled.match_many(args.words)):
+            print(f"{word} -> {'accept' if accepted else 'reject'}")
+    elif args.command == 'find':
+        if args.input == '-':
+            data = sys.stdin.buffer.read()
+        else:
+            with open(args.input, 'rb') as f:
+                data = f.read()
+        for start, end in compiled.iter_find(data):
+            print(f"{start} {end} {data[start:end].decode('utf-8', 'backslashreplace')}")
+    else:
+        results = benchmark(compiled, args.megabytes, args.words, args.seed)
+        if args.json:
+            print(json.dumps(results, indent=2))
+        else:
+            for name, value in results.items():
+                print(f"{name:18} {value:12.2f} MB/s" if isinstance(value, float) else f"{name:18} {value:12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""Метрики инструментов: время фаз, счётчики алгоритмов и уровни подробности вывода.
+
+Инструмент создаёт Metrics только при --metrics, --profile или
+--trace-memory и передаёт его функциям так же, как budget.Budget: None
+означает «не измерять», и горячие циклы ничего не платят. Счётчики
+копятся в локальных переменных и сообщаются одним вызовом count в конце
+фазы. Отчёт — один объект JSON:
+
+    {"tool": ..., "total_seconds": ..., "phases": {"parse": ..., ...},
+     "counters": {...}, "peak_rss_kb": ...,
+     "memory": {...}          — при --trace-memory (tracemalloc)
+     "profile": [...]}        — при --profile (cProfile, по cumulative)
+
+Диагностический вывод (таблицы соответствия состояний, трассировка
+очередей) печатается через echo с уровнем: QUIET (-q) не печатает ничего,
+NORMAL — то же, что и раньше, DEBUG (-v) — ещё и трассировку.
+"""
+import sys
+import json
+import time
+import argparse
+from contextlib import contextmanager, nullcontext
+
+QUIET = 0
+NORMAL = 1
+DEBUG = 2
+STDIO_PATH = '-'
+PROFILE_TOP = 25
+MEMORY_TOP = 10
+
+verbosity = NORMAL
+
+
+def set_verbosity(level):
+    global verbosity
+    verbosity = level
+
+
+def verbose(level=NORMAL):
+    return verbosity >= level
+
+
+def echo(level, *args, **kwargs):
+    if verbosity >= level:
+        print(*args, **kwargs)
+
+
+class Metrics:
+    """Накапливает время фаз и счётчики одного запуска инструмента"""
+
+    def __init__(self, tool, profile=None, trace_memory=False):
+        self.tool = tool
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.phases = {}
+        self.phase_peaks = {}
+        self.counters = {}
+        self.profiler = None
+        self.started = None
+
+    def start(self):
+        if self.trace_memory:
+            import tracemalloc
+            tracemalloc.start()
+        if self.profile:
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.started = time.perf_counter()
+        return self
+
+    @contextmanager
+    def phase(self, name):
+        """Время фазы добавляется к уже набранному под тем же именем"""
+        if self.trace_memory:
+            import tracemalloc
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+            if self.trace_memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                self.phase_peaks[name] = max(self.phase_peaks.get(name, 0), peak)
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def report(self):
+        total = time.perf_counter() - self.started
+        if self.profiler is not None:
+            self.profiler.disable()
+        report = {
+            'tool': self.tool,
+            'total_seconds': total,
+            'phases': self.phases,
+            'counters': self.counters,
+            'peak_rss_kb': peak_rss_kb(),
+        }
+        if self.trace_memory:
+            report['memory'] = self.memory_report()
+        if self.profiler is not None:
+            report['profile'] = self.profile_report()
+        return report
+
+    def memory_report(self):
+        import tracemalloc
+
+        current, peak = tracemalloc.get_traced_memory()
+        # Импорты и сами профилировщики в топ выделений не попадают
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, pattern)
+            for pattern in ('<frozen *>', '<unknown>', tracemalloc.__file__, '*/profile.py', '*/cProfile.py')
+        ])
+        top = snapshot.statistics('lineno')[:MEMORY_TOP]
+        return {
+            'current_bytes': current,
+            'peak_bytes': peak,
+            'phase_peak_bytes': self.phase_peaks,
+            'top_allocations': [{'location': str(stat.traceback), 'bytes': stat.size, 'blocks': stat.count}
+                                for stat in top],
+        }
+
+    def profile_report(self):
+        import pstats
+
+        if isinstance(self.profile, str):
+            self.profiler.dump_stats(self.profile)
+        stats = pstats.Stats(self.profiler)
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:PROFILE_TOP]
+        return [
+            {'function': f"{path}:{line}({name})", 'calls': calls, 'total_seconds': total, 'cumulative_seconds': cumulative}
+            for (path, line, name), (_, calls, total, cumulative, _) in rows
+        ]
+
+    def write(self, path):
+        text = json.dumps(self.report(), ensure_ascii=False, indent=2)
+        if path in (None, STDIO_PATH):
+            print(text, file=sys.stderr)
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text + '\n')
+
+
+def peak_rss_kb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux сообщает килобайты, macOS — байты
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def phase(metrics, name):
+    """Контекст фазы; при metrics=None ничего не делает"""
+    return nullcontext() if metrics is None else metrics.phase(name)
+
+
+def add_metrics_arguments(parser):
+    group = parser.add_argument_group("metrics")
+    group.add_argument('--metrics', metavar='FILE', help="записать метрики в JSON (\"-\" — в stderr)")
+    group.add_argument('--profile', metavar='FILE', nargs='?', const=True,
+                       help="включить cProfile; с FILE — сохранить статистику pstats")
+    group.add_argument('--trace-memory', action='store_true', help="включить tracemalloc")
+    group.add_argument('-v', '--verbose', action='store_const', const=DEBUG, dest='verbosity', default=NORMAL,
+                       help="печатать трассировку построения")
+    group.add_argument('-q', '--quiet', action='store_const', const=QUIET, dest='verbosity',
+                       help="не печатать диагностику")
+
+
+def split_metrics_arguments(argv):
+    """Для инструментов с ручным разбором argv: опции метрик и остальные аргументы"""
+    parser = argparse.ArgumentParser(add_help=False)
+    add_metrics_arguments(parser)
+    return parser.parse_known_args(argv)
+
+
+def metrics_from_args(args, tool):
+    """Выставляет уровень вывода и запускает Metrics, если метрики запрошены"""
+    set_verbosity(args.verbosity)
+    if not (args.metrics or args.profile or args.trace_memory):
+        return None
+    return Metrics(tool, args.profile, args.trace_memory).start()
+
+
+def write_metrics(metrics, args):
+    if metrics is not None:
+        metrics.write(args.metrics)
@@ -0,0 +1,99 @@
+"""Конвейер грамматика → НКА → ДКА → минимальный ДКА в памяти.
+
+Стадии обмениваются объектами core.NFA и core.DFA вместо промежуточных
+CSV; файлы стадий пишутся только по запросу теми же функциями, что и в
+лабораторных, поэтому результат совпадает с цепочкой
+grammar1.py → determination.py → Minimization.py moore.
+"""
+import sys
+import argparse
+
+from automata import labs  # noqa: F401 — добавляет папки лабораторных в sys.path
+from automata.core import EPSILON, NO_STATE, NFA, DFABuilder
+from automata.metrics import phase, add_metrics_arguments, metrics_from_args, write_metrics
+
+import determination
+import grammar1
+import Minimization
+
+
+def grammar_to_nfa(grammar_file, nfa_csv=None, reduce=False, metrics=None):
+    with phase(metrics, 'parse'):
+        grammar = grammar1.read_grammar_stream(grammar_file)
+    if not grammar.left and not grammar.right:
+        raise ValueError("Grammar is not regular")
+    if reduce:
+        with phase(metrics, 'reduction'):
+            grammar, report = grammar1.reduce_grammar(grammar, grammar.left)
+        grammar1.print_reduction(report)
+
+    with phase(metrics, 'grammar_to_nfa'):
+        states, transitions, symbols, finals = grammar1.build_nfa_stream(grammar, grammar.left)
+        ordered_states, outputs, rows = grammar1.nfa_table(states, transitions, symbols)
+        nfa = NFA.from_table(ordered_states, outputs, rows)
+    if nfa_csv:
+        with phase(metrics, 'export'):
+            grammar1.write_csv(nfa_csv, states, transitions, symbols, finals)
+    return nfa
+
+
+def determinize(nfa, dfa_csv=None, budget=None, metrics=None):
+    alphabet = sorted(set(nfa.input_names) - {EPSILON})
+    dfa, state_map = determination.convert(nfa, alphabet, budget, metrics)
+    if dfa_csv:
+        with phase(metrics, 'export'):
+            determination.export_dfa(dfa, state_map, dfa_csv)
+    # Как в CSV: входы без переходов в ДКА не попадают
+    return dfa.select_inputs(determination.used_inputs(dfa))
+
+
+def minimize(dfa, output_file=None, backend=Minimization.DEFAULT_BACKEND, metrics=None):
+    with phase(metrics, 'refinement'):
+        classes = Minimization.minimize_dfa(dfa, backend, metrics)
+    if output_file:
+        with phase(metrics, 'export'):
+            Minimization.write_dfa_output(output_file, dfa, classes)
+
+    width = dfa.num_states
+    builder = DFABuilder(dfa.input_names, dfa.output_names)
+    for state, class_id in enumerate(classes):
+        if class_id == len(builder.state_names):
+            builder.add_state(f"q{class_id}", dfa.state_output(state), [
+                classes[target] if 0 <= target < width else NO_STATE for target in dfa.row(state)
+            ])
+    return builder.build()
+
+
+def run_pipeline(grammar_file, output_file=None, nfa_csv=None, dfa_csv=None,
+                 backend=Minimization.DEFAULT_BACKEND, budget=None, reduce=False, metrics=None):
+    """Грамматика → НКА → ДКА → минимальный ДКА; возвращает минимальный автомат"""
+    nfa = grammar_to_nfa(grammar_file, nfa_csv, reduce, metrics)
+    dfa = determinize(nfa, dfa_csv, budget, metrics)
+    return minimize(dfa, output_file, backend, metrics)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Грамматика → минимальный ДКА без промежуточных CSV")
+    parser.add_argument('grammar')
+    parser.add_argument('output')
+    parser.add_argument('--nfa-csv', help="записать НКА, как grammar1.py")
+    parser.add_argument('--dfa-csv', help="записать ДКА, как determination.py")
+    parser.add_argument('--backend', choices=Minimization.REFINE_BACKENDS, default=Minimization.DEFAULT_BACKEND)
+    parser.add_argument('--reduce', action='store_true', help="сократить грамматику перед построением НКА")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    metrics = metrics_from_args(args, 'pipeline')
+
+    try:
+        minimal = run_pipeline(args.grammar, args.output, args.nfa_csv, args.dfa_csv, args.backend,
+                               reduce=args.reduce, metrics=metrics)
+    except ValueError as error:
+        print(f"Error: {error}")
+        sys.exit(1)
+    if metrics is not None:
+        metrics.count('minimal_states', minimal.num_states)
+    write_metrics(metrics, args)
+
+
+if __name__ == "__main__":
+    main()
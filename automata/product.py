@@ -0,0 +1,230 @@
+"""Произведение ДКА (пересечение, объединение, разность) только по достижимым парам.
+
+Пара состояний (p, q) хранится одним int: p · (|B| + 1) + q, где |B| —
+сток второго автомата. Словарь «пара → номер состояния» пополняется
+обходом в ширину от пары начальных состояний, так что полное
+произведение |A| × |B| не выделяется. Пары, из которых принимающая пара
+недостижима ни при каком слове, отбрасываются сразу. Для этого заранее
+считается, из каких состояний каждого автомата достижимо финальное:
+  - пересечение — мертва, если мертво хотя бы одно состояние;
+  - объединение — если мертвы оба;
+  - разность A \\ B — если мертво состояние A.
+Переход в мёртвую пару — пустая ячейка, как у determination.py.
+
+Проверка пустоты (--empty) идёт тем же обходом, но без таблицы. Она
+останавливается на первой принимающей паре и возвращает кратчайшее слово
+языка. --minimize прогоняет результат через Minimization, как
+automata.pipeline.
+
+    python -m automata.product intersection|union|difference first.csv second.csv output.csv
+                              [--minimize] [--accept F] [--max-states N]
+    python -m automata.product intersection first.csv second.csv --empty
+"""
+import sys
+import argparse
+from collections import deque
+
+from automata import labs  # noqa: F401 — добавляет папки лабораторных в sys.path
+from automata.core import NO_STATE, Interner, DFABuilder
+from automata.equivalence import MachineView, input_alphabet
+from automata.matcher import ACCEPTING_OUTPUTS, read_dfa
+from automata.metrics import echo, NORMAL, phase, add_metrics_arguments, metrics_from_args, write_metrics
+
+import determination
+from budget import BudgetExceeded, add_budget_arguments, budget_from_args
+
+FINAL = 'F'
+# Операция → (принимает ли пара, мертва ли пара по «мертвы ли» состояния A и B)
+OPERATIONS = {
+    'intersection': (lambda a, b: a and b, lambda dead_a, dead_b: dead_a or dead_b),
+    'union': (lambda a, b: a or b, lambda dead_a, dead_b: dead_a and dead_b),
+    'difference': (lambda a, b: a and not b, lambda dead_a, dead_b: dead_a),
+}
+
+
+def dead_states(view):
+    """1 для состояний (и стока), из которых финальное недостижимо"""
+    count = view.sink + 1
+    predecessors = [[] for _ in range(count)]
+    for targets in view.targets:
+        for state, target in enumerate(targets):
+            predecessors[target].append(state)
+    dead = bytearray(b'\1') * count
+    stack = [state for state in range(count) if view.state_outputs[state]]
+    for state in stack:
+        dead[state] = 0
+    while stack:
+        for source in predecessors[stack.pop()]:
+            if dead[source]:
+                dead[source] = 0
+                stack.append(source)
+    return dead
+
+
+class Product:
+    """Общая часть построения и проверки пустоты: операнды, упаковка пар, мёртвые пары"""
+
+    def __init__(self, first, second, operation, accepting=ACCEPTING_OUTPUTS):
+        if operation not in OPERATIONS:
+            raise ValueError(f"Unknown operation {operation!r}, use: {', '.join(OPERATIONS)}")
+        self.alphabet = input_alphabet(first, second)
+        output_ids = Interner()
+        self.a = MachineView(first, self.alphabet, output_ids, False, accepting)
+        self.b = MachineView(second, self.alphabet, output_ids, False, accepting)
+        self.accepts, dead = OPERATIONS[operation]
+        dead_a, dead_b = dead_states(self.a), dead_states(self.b)
+        self.stride = self.b.sink + 1
+        # Мёртвость пары по упакованному номеру без распаковки
+        self.is_dead = lambda pair: dead(dead_a[pair // self.stride], dead_b[pair % self.stride])
+        self.start = self.a.start * self.stride + self.b.start
+
+    def pair_accepts(self, pair):
+        p, q = divmod(pair, self.stride)
+        return self.accepts(self.a.state_outputs[p], self.b.state_outputs[q])
+
+    def successors(self, pair):
+        """Упакованная пара по каждому входу или NO_STATE, если она мертва"""
+        p, q = divmod(pair, self.stride)
+        stride = self.stride
+        is_dead = self.is_dead
+        result = []
+        for targets_a, targets_b in zip(self.a.targets, self.b.targets):
+            following = targets_a[p] * stride + targets_b[q]
+            result.append(NO_STATE if is_dead(following) else following)
+        return result
+
+    def build(self, budget=None, metrics=None):
+        """(ДКА произведения, пары его состояний); состояния — S0, S1, ... в порядке обхода"""
+        pairs = [self.start]
+        ids = {self.start: 0}
+        builder = DFABuilder(self.alphabet)
+        if budget is not None:
+            budget.start()
+            budget.add_state(self.start, 2)
+        pruned = 0
+        # Состояния нумеруются в порядке обхода в ширину: pairs — и очередь, и нумерация
+        for index, pair in enumerate(pairs):
+            if budget is not None:
+                budget.check(len(pairs) - index)
+            row = []
+            for following in self.successors(pair):
+                if following == NO_STATE:
+                    pruned += 1
+                    row.append(NO_STATE)
+                    continue
+                target = ids.get(following)
+                if target is None:
+                    target = ids[following] = len(pairs)
+                    pairs.append(following)
+                    if budget is not None:
+                        budget.add_state(following, 2)
+                row.append(target)
+            builder.add_state(f'S{index}', FINAL if self.pair_accepts(pair) else '', row)
+        if metrics is not None:
+            metrics.count('product_states', len(pairs))
+            metrics.count('full_product_states', self.a.sink * self.b.sink)
+            metrics.count('pruned_transitions', pruned)
+        return builder.build(), [divmod(pair, self.stride) for pair in pairs]
+
+    def witness(self):
+        """Кратчайшее слово языка произведения (список имён входов) или None, если язык пуст"""
+        if self.is_dead(self.start):
+            return None
+        parents = {self.start: None}
+        queue = deque([self.start])
+        while queue:
+            pair = queue.popleft()
+            if self.pair_accepts(pair):
+                word = []
+                while parents[pair] is not None:
+                    pair, symbol = parents[pair]
+                    word.append(self.alphabet[symbol])
+                return word[::-1]
+            for symbol, following in enumerate(self.successors(pair)):
+                if following != NO_STATE and following not in parents:
+                    parents[following] = (pair, symbol)
+                    queue.append(following)
+        return None
+
+
+def product(first, second, operation, accepting=ACCEPTING_OUTPUTS, budget=None, metrics=None):
+    """ДКА пересечения, объединения или разности по достижимым живым парам"""
+    with phase(metrics, 'construction'):
+        return Product(first, second, operation, accepting).build(budget, metrics)[0]
+
+
+def is_empty(first, second, operation, accepting=ACCEPTING_OUTPUTS):
+    return Product(first, second, operation, accepting).witness() is None
+
+
+def export_product(dfa, pairs, first, second, output_file):
+    """CSV или .autb в формате determination.py; соответствие пар печатается, как там"""
+    echo(NORMAL, "States mapping:")
+    for index, (p, q) in enumerate(pairs):
+        echo(NORMAL, f"S{index} -> {state_name(first, p)},{state_name(second, q)}")
+    determination.write_dfa(dfa, output_file)
+
+
+def state_name(dfa, state):
+    """Имя состояния операнда; сток — «-»"""
+    return dfa.state_names[state] if state < dfa.num_states else '-'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пересечение, объединение и разность ДКА")
+    parser.add_argument('operation', choices=OPERATIONS)
+    parser.add_argument('first', help="ДКА из determination.py или Minimization.py (CSV или .autb)")
+    parser.add_argument('second')
+    parser.add_argument('output', nargs='?', help="CSV или .autb результата")
+    parser.add_argument('--empty', action='store_true',
+                        help="только проверить пустоту языка (код выхода 1, если слово есть)")
+    parser.add_argument('--minimize', action='store_true', help="минимизировать результат")
+    parser.add_argument('--accept', action='append', help="выходы финальных состояний (по умолчанию F)")
+    add_budget_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    if not args.empty and not args.output:
+        parser.error("output file is required unless --empty is given")
+    metrics = metrics_from_args(args, f"product {args.operation}")
+    accepting = tuple(args.accept or ACCEPTING_OUTPUTS)
+
+    try:
+        with phase(metrics, 'parse'):
+            first, second = read_dfa(args.first), read_dfa(args.second)
+        builder = Product(first, second, args.operation, accepting)
+    except ValueError as error:
+        print(f"Error: {error}")
+        sys.exit(1)
+
+    if args.empty:
+        with phase(metrics, 'search'):
+            word = builder.witness()
+        write_metrics(metrics, args)
+        if word is None:
+            print("empty")
+            sys.exit(0)
+        print(f"not empty: shortest word '{' '.join(word) if word else 'ε'}'")
+        sys.exit(1)
+
+    try:
+        with phase(metrics, 'construction'):
+            dfa, pairs = builder.build(budget_from_args(args), metrics)
+    except BudgetExceeded as error:
+        print(error.report(), file=sys.stderr)
+        sys.exit(1)
+
+    if args.minimize:
+        from automata.pipeline import minimize
+
+        minimal = minimize(dfa.select_inputs(determination.used_inputs(dfa)), args.output, metrics=metrics)
+        if metrics is not None:
+            metrics.count('minimal_states', minimal.num_states)
+    else:
+        with phase(metrics, 'export'):
+            export_product(dfa, pairs, first, second, args.output)
+    echo(NORMAL, "exported to", args.output)
+    write_metrics(metrics, args)
+
+
+if __name__ == "__main__":
+    main()
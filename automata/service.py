@@ -0,0 +1,529 @@
+"""Локальный сервис автоматов: тёплые процессы вместо запуска интерпретатора на каждую операцию.
+
+Сервер на asyncio слушает Unix-сокет (или 127.0.0.1:PORT с --port) и
+принимает JSON по строке на запрос:
+
+    {"op": "run", "tool": "determination", "argv": ["in.csv", "out.csv"], "cwd": "..."}
+    {"op": "load", "path": "dfa.csv"}                → {"handle": ..., "kind": ..., ...}
+    {"op": "match", "handle": ..., "words": [...]}   → принадлежность слов языку ДКА
+    {"op": "simulate", "handle": ..., "sequences": [[...], ...]}
+    {"op": "equivalent", "first": ..., "second": ..., "accept": ["F"]}
+    {"op": "batch", "requests": [...]}               → ответы в том же порядке
+    {"op": "handles"}, {"op": "unload", "handle": ...}, {"op": "ping"}, {"op": "shutdown"}
+
+Ответ — {"ok": true, "result": ...} или {"ok": false, "error": "..."}.
+run выполняет main() инструмента лабораторной с тем же argv и возвращает
+код выхода, stdout и stderr. Поэтому клиент
+
+    python -m automata.service run MealyMoore mealy-to-moore input.csv output.csv
+
+ведёт себя как сам скрипт. Если сервис не запущен или вход читается из
+stdin, клиент выполняет инструмент у себя.
+
+Работу делает пул процессов: воркеры заранее импортируют все
+инструменты, а разобранные автоматы хранят под ключом handle. Handle —
+путь, размер и время изменения файла. Каждое обращение сверяет их с
+файлом, так что после изменения файла handle отказывает в любом воркере
+одинаково, пока файл не загрузят заново. Воркер держит не больше
+MAX_LOADED разобранных автоматов (LRU) и одну версию каждого файла, так
+что долгоживущий сервис не копит старые handle. Запросы batch выполняются
+параллельно.
+
+Unix-сокет создаётся с правами 0600. По TCP видны все локальные
+пользователи, поэтому первым сообщением соединения должен быть
+{"op": "auth", "token": ...}: токен сервер пишет в файл рядом с сокетом
+(automata-USER-PORT.token, права 0600), и прочитать его может только
+владелец сервиса. Без токена сервер отвечает ошибкой и закрывает
+соединение — иначе run по TCP писал бы файлы от имени владельца по
+запросу любого пользователя.
+
+    python -m automata.service serve [--socket PATH | --port N] [--workers N]
+    python -m automata.service stop | ping | call JSON | batch requests.jsonl
+"""
+import io
+import os
+import sys
+import json
+import socket
+import asyncio
+import argparse
+import importlib
+import secrets
+import tempfile
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext, redirect_stdout, redirect_stderr
+
+from automata import labs  # noqa: F401 — добавляет папки лабораторных в sys.path
+from automata.cache import source_fingerprint
+
+SOCKET_VARIABLE = 'AUTOMATA_SOCKET'
+HOST = '127.0.0.1'
+# Предел строки запроса: batch со словами и трассами бывает большим
+MAX_MESSAGE = 64 << 20
+STDIO_PATH = '-'
+# Разобранных автоматов в одном воркере; давно не использованные вытесняются
+MAX_LOADED = 16
+
+# Инструмент → модуль с main(), как у скриптов лабораторных
+TOOLS = {
+    'MealyMoore': 'MealyMoore',
+    'Minimization': 'Minimization',
+    'determination': 'determination',
+    'd1': 'd1',
+    'd2': 'd2',
+    'grammar': 'grammar',
+    'grammar1': 'grammar1',
+    'pipeline': 'automata.pipeline',
+}
+
+
+class ServiceError(Exception):
+    """Ошибка, которую сервис вернул в ответе"""
+
+
+def runtime_file(name):
+    directory = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+    user = os.getuid() if hasattr(os, 'getuid') else os.getlogin()
+    return os.path.join(directory, f"automata-{user}{name}")
+
+
+def default_socket():
+    return os.environ.get(SOCKET_VARIABLE) or runtime_file('.sock')
+
+
+def token_path(port):
+    return runtime_file(f"-{port}.token")
+
+
+def write_token(path):
+    """Новый токен в файл с правами 0600; прежний файл (и подложенная ссылка) удаляется"""
+    token = secrets.token_hex(32)
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        f.write(token)
+    return token
+
+
+# Состояние процесса-воркера: разобранные автоматы и скомпилированные формы по handle, LRU
+_worker = OrderedDict()
+
+
+def start_worker():
+    for module in TOOLS.values():
+        importlib.import_module(module)
+    # Результаты кэша подписываются кодом, загруженным сейчас
+    source_fingerprint()
+
+
+def run_tool(tool, argv, cwd):
+    """main() инструмента с данным argv: (код выхода, stdout, stderr)"""
+    module = importlib.import_module(TOOLS[tool])
+    stdout, stderr = io.StringIO(), io.StringIO()
+    code = 0
+    saved_argv = sys.argv
+    saved_cwd = os.getcwd()
+    sys.argv = [tool, *argv]
+    try:
+        os.chdir(cwd)
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            try:
+                result = module.main()
+                code = result if isinstance(result, int) else 0
+            except SystemExit as error:
+                if isinstance(error.code, int) or error.code is None:
+                    code = error.code or 0
+                else:
+                    print(error.code, file=sys.stderr)
+                    code = 1
+            except Exception:
+                traceback.print_exc()
+                code = 1
+    finally:
+        sys.argv = saved_argv
+        os.chdir(saved_cwd)
+    return code, stdout.getvalue(), stderr.getvalue()
+
+
+def file_handle(path):
+    """Handle файла: путь, размер и время изменения"""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    return f"{path}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def handle_path(handle):
+    return handle.rsplit(':', 2)[0]
+
+
+def machine(handle):
+    """Разобранный автомат handle; файл, изменённый после load, — ошибка.
+
+    Файл проверяется при каждом обращении, а не только при разборе: иначе
+    воркер, разобравший файл раньше, отвечал бы по старой версии, а
+    остальные — ошибкой.
+    """
+    path = handle_path(handle)
+    if file_handle(path) != handle:
+        _worker.pop(handle, None)
+        raise ValueError(f"{path} changed since it was loaded, load it again")
+    loaded = _worker.get(handle)
+    if loaded is not None:
+        _worker.move_to_end(handle)
+        return loaded
+    from automata.simulator import read_machine
+
+    # Старые версии того же файла больше не понадобятся
+    for stale in [known for known in _worker if handle_path(known) == path]:
+        del _worker[stale]
+    loaded = _worker[handle] = {'machine': read_machine(path)}
+    while len(_worker) > MAX_LOADED:
+        _worker.popitem(last=False)
+    return loaded
+
+
+def describe_machine(handle):
+    dfa = machine(handle)['machine']
+    nondeterministic = any(',' in name for name in dfa.state_names[dfa.num_states:])
+    return {
+        'handle': handle,
+        'kind': 'nfa' if nondeterministic else 'mealy' if dfa.is_mealy else 'moore',
+        'states': dfa.num_states,
+        'inputs': list(dfa.input_names),
+        'outputs': list(dfa.output_names),
+    }
+
+
+def match_words(handle, words, accept=None):
+    from automata.matcher import CompiledDFA, ACCEPTING_OUTPUTS
+
+    kind = describe_machine(handle)['kind']
+    if kind != 'moore':
+        raise ServiceError(f"match needs a DFA, {handle_path(handle)} is {kind}"
+                           + (", run determination.py first" if kind == 'nfa' else ""))
+    accept = tuple(accept or ACCEPTING_OUTPUTS)
+    loaded = machine(handle)
+    compiled = loaded.get(('matcher', accept))
+    if compiled is None:
+        compiled = loaded[('matcher', accept)] = CompiledDFA(loaded['machine'], accept)
+    return compiled.match_many(words)
+
+
+def simulate_sequences(handle, sequences):
+    from automata import simulator
+    from automata.matcher import numpy_available
+
+    loaded = machine(handle)
+    if not numpy_available():
+        dfa = loaded['machine']
+        ids = dfa.input_ids()
+        return [[dfa.output_names[output]
+                 for output in simulator.simulate(dfa, [ids.get(name, -1) for name in sequence])]
+                for sequence in sequences]
+    batch = loaded.get('simulator')
+    if batch is None:
+        batch = loaded['simulator'] = simulator.Simulator(loaded['machine'])
+    outputs, _ = batch.run(batch.input_ids(sequences))
+    return [batch.output_names(row) for row in outputs]
+
+
+def check_equivalence(first, second, accept=None):
+    from automata.equivalence import counterexample
+
+    result = counterexample(machine(first)['machine'], machine(second)['machine'], tuple(accept) if accept else None)
+    if result is None:
+        return None
+    word, first_output, second_output = result
+    return {'word': word, 'first': first_output, 'second': second_output}
+
+
+class Service:
+    """Обработка запросов сервера; тяжёлое уходит в пул"""
+
+    def __init__(self, workers, token=None):
+        self.workers = workers
+        # Для TCP: соединение принимается только после auth с этим токеном
+        self.token = token
+        self.handles = {}
+        self.pool = self.make_pool()
+        self.stopped = asyncio.Event()
+
+    def make_pool(self):
+        if self.workers:
+            return ProcessPoolExecutor(max_workers=self.workers, initializer=start_worker)
+        # Без воркеров — один поток в этом же процессе: run меняет sys.argv и cwd
+        start_worker()
+        return ThreadPoolExecutor(max_workers=1)
+
+    async def call(self, function, *args):
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.pool, function, *args)
+        except BrokenProcessPool:
+            self.pool = self.make_pool()
+            raise ServiceError("worker process died, the pool was restarted")
+
+    def handle_of(self, request, key='handle'):
+        handle = request.get(key)
+        if handle not in self.handles:
+            raise ServiceError(f"unknown handle {handle!r}, load the file first")
+        return handle
+
+    async def dispatch(self, request):
+        op = request.get('op')
+        if op == 'batch':
+            return await asyncio.gather(*(self.respond(item) for item in request.get('requests', [])))
+        if op == 'ping':
+            return {'pid': os.getpid(), 'workers': self.workers, 'handles': len(self.handles)}
+        if op == 'run':
+            tool = request.get('tool')
+            if tool not in TOOLS:
+                raise ServiceError(f"unknown tool {tool!r}, use: {', '.join(TOOLS)}")
+            code, stdout, stderr = await self.call(run_tool, tool, list(request.get('argv', [])),
+                                                   request.get('cwd') or os.getcwd())
+            return {'code': code, 'stdout': stdout, 'stderr': stderr}
+        if op == 'load':
+            handle = file_handle(request['path'])
+            description = await self.call(describe_machine, handle)
+            # Прежние handle того же файла уже не пройдут проверку в воркерах
+            path = handle_path(handle)
+            for stale in [known for known in self.handles if handle_path(known) == path]:
+                del self.handles[stale]
+            self.handles[handle] = description
+            return self.handles[handle]
+        if op == 'unload':
+            return self.handles.pop(self.handle_of(request), None) is not None
+        if op == 'handles':
+            return list(self.handles.values())
+        if op == 'match':
+            return await self.call(match_words, self.handle_of(request), request.get('words', []), request.get('accept'))
+        if op == 'simulate':
+            return await self.call(simulate_sequences, self.handle_of(request), request.get('sequences', []))
+        if op == 'equivalent':
+            return await self.call(check_equivalence, self.handle_of(request, 'first'),
+                                   self.handle_of(request, 'second'), request.get('accept'))
+        if op == 'shutdown':
+            self.stopped.set()
+            return True
+        raise ServiceError(f"unknown op {op!r}")
+
+    async def respond(self, request):
+        try:
+            return {'ok': True, 'result': await self.dispatch(request)}
+        except Exception as error:
+            # Любая ошибка запроса — ответ, а не оборванное соединение
+            return {'ok': False, 'error': f"{type(error).__name__}: {error}"}
+
+    def authenticated(self, line):
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return False
+        return (isinstance(request, dict) and request.get('op') == 'auth'
+                and isinstance(request.get('token'), str)
+                and secrets.compare_digest(request['token'], self.token))
+
+    async def connection(self, reader, writer):
+        try:
+            if self.token is not None:
+                if not self.authenticated(await reader.readline()):
+                    response = {'ok': False, 'error': "authentication required, send the token from the token file"}
+                    writer.write(json.dumps(response).encode('utf-8') + b'\n')
+                    await writer.drain()
+                    return
+                writer.write(json.dumps({'ok': True, 'result': True}).encode('utf-8') + b'\n')
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                except ValueError as error:
+                    response = {'ok': False, 'error': f"bad request: {error}"}
+                else:
+                    if not isinstance(request, dict):
+                        response = {'ok': False, 'error': "bad request: expected a JSON object"}
+                    else:
+                        response = await self.respond(request)
+                writer.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(socket_path=None, port=None, workers=None):
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    if port is not None:
+        service = Service(workers, write_token(token_path(port)))
+        server = await asyncio.start_server(service.connection, HOST, port, limit=MAX_MESSAGE)
+        address = f"{HOST}:{port}"
+    else:
+        service = Service(workers)
+        if os.path.exists(socket_path):
+            if ping(socket_path):
+                raise ServiceError(f"service is already running on {socket_path}")
+            os.remove(socket_path)
+        # Сокет 0600 при любом umask: подключиться может только владелец
+        umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(service.connection, socket_path, limit=MAX_MESSAGE)
+        finally:
+            os.umask(umask)
+        address = socket_path
+    print(f"listening on {address} with {service.workers} workers", flush=True)
+    try:
+        async with server:
+            await service.stopped.wait()
+    finally:
+        service.pool.shutdown(cancel_futures=True)
+        leftover = token_path(port) if port is not None else socket_path
+        if os.path.exists(leftover):
+            os.remove(leftover)
+
+
+class Client:
+    """Синхронный клиент: по запросу на строку, ответы по порядку"""
+
+    def __init__(self, socket_path=None, port=None):
+        if port is not None:
+            with open(token_path(port), encoding='utf-8') as f:
+                token = f.read().strip()
+            self.socket = socket.create_connection((HOST, port))
+        else:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                self.socket.connect(socket_path or default_socket())
+            except OSError:
+                self.socket.close()
+                raise
+        self.stream = self.socket.makefile('rwb')
+        if port is not None:
+            try:
+                response = self.send({'op': 'auth', 'token': token})
+            except (OSError, ValueError):
+                self.close()
+                raise
+            if not response['ok']:
+                self.close()
+                raise PermissionError(response['error'])
+
+    def close(self):
+        self.stream.close()
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def send(self, request):
+        """Ответ сервиса как есть: {"ok": ..., "result"/"error": ...}"""
+        self.stream.write(json.dumps(request, ensure_ascii=False).encode('utf-8') + b'\n')
+        self.stream.flush()
+        line = self.stream.readline()
+        if not line:
+            raise ConnectionError("service closed the connection")
+        return json.loads(line)
+
+    def request(self, op, **params):
+        response = self.send({'op': op, **params})
+        if not response['ok']:
+            raise ServiceError(response['error'])
+        return response['result']
+
+    def batch(self, requests):
+        """Ответы на запросы пакета в том же порядке"""
+        return self.request('batch', requests=list(requests))
+
+    def run(self, tool, argv, cwd=None):
+        return self.request('run', tool=tool, argv=list(argv), cwd=os.path.abspath(cwd or os.getcwd()))
+
+
+def ping(socket_path=None, port=None):
+    try:
+        with Client(socket_path, port) as client:
+            return client.request('ping')
+    except OSError:
+        return None
+
+
+def run_command(tool, argv, socket_path=None, port=None):
+    """Замена скрипта: через сервис, а без него или при чтении stdin — в этом процессе"""
+    if STDIO_PATH not in argv:
+        try:
+            with Client(socket_path, port) as client:
+                result = client.run(tool, argv)
+            sys.stdout.write(result['stdout'])
+            sys.stderr.write(result['stderr'])
+            return result['code']
+        except OSError:
+            pass
+    module = importlib.import_module(TOOLS[tool])
+    sys.argv = [tool, *argv]
+    try:
+        result = module.main()
+    except SystemExit as error:
+        return error.code
+    return result if isinstance(result, int) else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальный сервис автоматов и его клиент")
+    parser.add_argument('--socket', help=f"Unix-сокет (по умолчанию ${SOCKET_VARIABLE} или {default_socket()})")
+    parser.add_argument('--port', type=int, help="слушать/подключаться к 127.0.0.1:PORT вместо сокета")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    serve_parser = subparsers.add_parser('serve', help="запустить сервис")
+    serve_parser.add_argument('--workers', type=int, help="процессов в пуле (0 — в этом процессе)")
+    run_parser = subparsers.add_parser('run', help="выполнить инструмент, как его скрипт")
+    run_parser.add_argument('tool', choices=TOOLS)
+    run_parser.add_argument('argv', nargs=argparse.REMAINDER)
+    call_parser = subparsers.add_parser('call', help="отправить один запрос JSON")
+    call_parser.add_argument('request')
+    batch_parser = subparsers.add_parser('batch', help="отправить запросы JSON Lines одним пакетом")
+    batch_parser.add_argument('requests', help="файл (\"-\" — stdin)")
+    subparsers.add_parser('ping', help="проверить, что сервис запущен")
+    subparsers.add_parser('stop', help="остановить сервис")
+    args = parser.parse_args()
+    socket_path = args.socket or default_socket()
+
+    if args.command == 'serve':
+        try:
+            asyncio.run(serve(socket_path, args.port, args.workers))
+        except ServiceError as error:
+            print(f"Error: {error}")
+            sys.exit(1)
+        return
+    if args.command == 'run':
+        sys.exit(run_command(args.tool, args.argv, socket_path, args.port))
+
+    try:
+        client = Client(socket_path, args.port)
+    except OSError as error:
+        print(f"Error: service is not running ({error})")
+        sys.exit(1)
+    try:
+        with client:
+            if args.command == 'ping':
+                print(json.dumps(client.request('ping')))
+            elif args.command == 'stop':
+                client.request('shutdown')
+                print("stopped")
+            elif args.command == 'call':
+                print(json.dumps(client.send(json.loads(args.request)), ensure_ascii=False, indent=2))
+            else:
+                with (open(args.requests, encoding='utf-8') if args.requests != STDIO_PATH else nullcontext(sys.stdin)) as f:
+                    requests = [json.loads(line) for line in f if line.strip()]
+                for response in client.batch(requests):
+                    print(json.dumps(response, ensure_ascii=False))
+    except ServiceError as error:
+        print(f"Error: {error}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""Пакетная симуляция автоматов Мили и Мура на NumPy.
+
+Таблица автомата (CSV лабораторных 1–2 или .autb) превращается в два
+плоских массива: следующее состояние и выход для каждой ячейки
+(вход, состояние), в том же порядке «вход, затем состояние», что и
+core.DFA. Все последовательности пакета шагают одновременно: шаг — три
+векторные операции длины N (номер ячейки, выход, следующее состояние),
+цикл Python идёт только по времени.
+
+Выход автомата Мура на шаге — выход состояния, в которое он перешёл.
+Так же устроен выход перехода Мили после mealy-to-moore/moore-to-mealy,
+поэтому эквивалентные автоматы дают одинаковые потоки. Выходы — номера в
+output_names. HALTED (-1) значит, что переход не определён (пустая ячейка,
+цель без столбца, неизвестный вход); после этого последовательность
+стоит на месте. Вход PAD (-1) дополняет короткие последовательности:
+состояние не меняется, выход HALTED.
+
+stream() отдаёт выходы блоками по chunk шагов, так что память —
+O(N · chunk) при любой длине трасс. Входы можно подавать итератором
+блоков, например срезами numpy.memmap.
+
+    python -m automata.simulator machine.csv run traces.csv [outputs.csv] [--batch N]
+    python -m automata.simulator machine.csv bench [--sequences N] [--length T] [--chunk K]
+"""
+import sys
+import csv
+import json
+import time
+import argparse
+from contextlib import nullcontext
+
+from automata import binary
+from automata.core import DFA, NO_STATE
+
+HALTED = -1
+PAD = -1
+INITIAL_STATE = 0
+# Ячеек (последовательностей × шагов) в одном блоке stream по умолчанию
+BLOCK_CELLS = 1 << 22
+DEFAULT_BATCH = 10000
+CSV_DELIMITER = ';'
+STDIO_PATH = '-'
+
+
+def read_machine(path):
+    """core.DFA автомата Мили или Мура из CSV или двоичного файла"""
+    if binary.is_binary_file(path):
+        with binary.BinaryAutomaton(path) as automaton:
+            return DFA.from_binary(automaton)
+    rows = binary.read_csv_rows(path)
+    if binary.table_kind(rows) == binary.KIND_MOORE:
+        return DFA.from_moore(rows[1][1:], rows[0][1:], rows[2:])
+    return DFA.from_mealy(rows[0][1:], rows[1:])
+
+
+def simulate(machine, inputs, state=INITIAL_STATE):
+    """Поток номеров выходов одной последовательности номеров входов, без NumPy"""
+    width = machine.num_states
+    for symbol in inputs:
+        if not 0 <= symbol < machine.num_inputs:
+            return
+        cell = symbol * width + state
+        target = machine.table[cell]
+        if target == NO_STATE:
+            return
+        if machine.is_mealy:
+            yield machine.transition_outputs[cell]
+        elif target < width:
+            yield machine.outputs[target]
+        else:
+            return
+        if target >= width:
+            return
+        state = target
+
+
+class Simulator:
+    """Таблицы переходов и выходов автомата с двумя служебными строками.
+
+    Строка num_inputs — неизвестный вход (всё ведёт в halt), строка
+    num_inputs + 1 — PAD (тождество); столбец halt — остановленная
+    последовательность.
+    """
+
+    def __init__(self, machine):
+        import numpy as np
+
+        self.machine = machine
+        width = machine.num_states
+        inputs = machine.num_inputs
+        self.halt = width
+        self.width = width + 1
+        self.unknown = inputs
+        self.pad = inputs + 1
+
+        table = np.asarray(machine.table, dtype=np.int64).reshape(inputs, width)
+        defined = (table >= 0) & (table < width)
+        if machine.is_mealy:
+            # Переход в состояние без столбца ещё выдаёт свой выход, затем автомат стоит
+            outputs = np.asarray(machine.transition_outputs, dtype=np.int64).reshape(inputs, width)
+            outputs = np.where(table != NO_STATE, outputs, HALTED)
+        else:
+            state_outputs = np.asarray(machine.outputs, dtype=np.int64)
+            outputs = np.where(defined, state_outputs[np.where(defined, table, 0)], HALTED)
+
+        next_states = np.full((inputs + 2, self.width), self.halt, dtype=np.int64)
+        next_states[:inputs, :width] = np.where(defined, table, self.halt)
+        next_states[self.pad] = np.arange(self.width)
+        output_table = np.full((inputs + 2, self.width), HALTED, dtype=np.int32)
+        output_table[:inputs, :width] = outputs
+        self.next_states = next_states.ravel()
+        self.outputs = output_table.ravel()
+
+    @classmethod
+    def from_file(cls, path):
+        return cls(read_machine(path))
+
+    def input_ids(self, sequences):
+        """Последовательности имён входов → массив N × T номеров, короткие дополнены PAD"""
+        import numpy as np
+
+        ids = self.machine.input_ids()
+        sequences = [list(sequence) for sequence in sequences]
+        length = max(map(len, sequences), default=0)
+        result = np.full((len(sequences), length), PAD, dtype=np.int32)
+        for row, sequence in enumerate(sequences):
+            result[row, :len(sequence)] = [ids.get(name, self.unknown) for name in sequence]
+        return result
+
+    def output_names(self, outputs):
+        """Строка выходов → имена выходов до первого HALTED"""
+        names = self.machine.output_names
+        result = []
+        for output in outputs.tolist():
+            if output == HALTED:
+                break
+            result.append(names[output])
+        return result
+
+    def initial_states(self, count):
+        import numpy as np
+
+        return np.full(count, INITIAL_STATE if self.machine.num_states else self.halt, dtype=np.int64)
+
+    def feed(self, states, block):
+        """Один блок N × k номеров входов → (выходы N × k, состояния после блока)"""
+        import numpy as np
+
+        block = np.asarray(block)
+        # Номера вне [0, num_inputs) — неизвестный вход, PAD — служебная строка
+        rows = np.where((block >= 0) & (block < self.unknown), block, self.unknown)
+        rows = np.where(block == PAD, self.pad, rows)
+        columns = np.ascontiguousarray(rows.T, dtype=np.int64) * self.width
+        outputs = np.empty(columns.shape, dtype=np.int32)
+        for step, column in enumerate(columns):
+            cells = column + states
+            outputs[step] = self.outputs[cells]
+            states = self.next_states[cells]
+        return outputs.T, states
+
+    def stream(self, inputs, chunk=None, states=None):
+        """Генератор (выходы блока N × k, состояния после блока).
+
+        inputs — массив N × T (режется на блоки по chunk шагов) или итератор
+        уже готовых блоков N × k.
+        """
+        if hasattr(inputs, 'shape'):
+            count, length = inputs.shape
+            chunk = chunk or max(1, BLOCK_CELLS // max(count, 1))
+            blocks = (inputs[:, start:start + chunk] for start in range(0, length, chunk))
+        else:
+            blocks = iter(inputs)
+        for block in blocks:
+            if states is None:
+                states = self.initial_states(len(block))
+            outputs, states = self.feed(states, block)
+            yield outputs, states
+
+    def run(self, inputs, states=None):
+        """(выходы N × T, конечные состояния) целиком в памяти"""
+        import numpy as np
+
+        if states is None:
+            states = self.initial_states(len(inputs))
+        outputs, states = self.feed(states, inputs)
+        return np.ascontiguousarray(outputs), states
+
+
+def read_traces(path, batch):
+    """Трассы CSV (по последовательности имён входов в строке) пакетами по batch строк"""
+    with (open(path, newline='', encoding='utf-8') if path != STDIO_PATH else nullcontext(sys.stdin)) as f:
+        sequences = []
+        for row in csv.reader(f, delimiter=CSV_DELIMITER):
+            sequences.append(row)
+            if len(sequences) == batch:
+                yield sequences
+                sequences = []
+        if sequences:
+            yield sequences
+
+
+def run_traces(simulator, traces_path, output_path, batch=DEFAULT_BATCH):
+    """Выходы каждой трассы — строкой CSV; строка короче трассы — автомат остановился"""
+    with (open(output_path, 'w', newline='', encoding='utf-8') if output_path != STDIO_PATH
+          else nullcontext(sys.stdout)) as f:
+        writer = csv.writer(f, delimiter=CSV_DELIMITER)
+        for sequences in read_traces(traces_path, batch):
+            outputs, _ = simulator.run(simulator.input_ids(sequences))
+            writer.writerows(simulator.output_names(row) for row in outputs)
+
+
+def benchmark(simulator, sequences, length, chunk=None, seed=0):
+    """Шагов в секунду на случайных входах; входы строятся блоками и не хранятся"""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    chunk = chunk or max(1, BLOCK_CELLS // sequences)
+    inputs = simulator.machine.num_inputs
+    states = simulator.initial_states(sequences)
+    elapsed = 0.0
+    for start in range(0, length, chunk):
+        block = rng.integers(0, inputs, (sequences, min(chunk, length - start)), dtype=np.int32)
+        started = time.perf_counter()
+        _, states = simulator.feed(states, block)
+        elapsed += time.perf_counter() - started
+
+    # Тот же объём для одной последовательности без NumPy — для сравнения
+    sample = rng.integers(0, inputs, min(length * sequences, 1 << 20), dtype=np.int32).tolist()
+    started = time.perf_counter()
+    python_steps = sum(1 for _ in simulate(simulator.machine, sample))
+    python_elapsed = time.perf_counter() - started
+    return {
+        'states': simulator.machine.num_states,
+        'inputs': inputs,
+        'mealy': simulator.machine.is_mealy,
+        'sequences': sequences,
+        'length': length,
+        'chunk': chunk,
+        'seconds': elapsed,
+        'steps_per_second': sequences * length / elapsed if elapsed else None,
+        'halted': int(np.count_nonzero(states == simulator.halt)),
+        'python_steps_per_second': python_steps / python_elapsed if python_elapsed else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пакетная симуляция автоматов Мили и Мура")
+    parser.add_argument('machine', help="автомат Мили или Мура (CSV или .autb)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    run = subparsers.add_parser('run', help="выходы для трасс из CSV")
+    run.add_argument('traces', help="CSV: по трассе входов в строке (\"-\" — stdin)")
+    run.add_argument('output', nargs='?', default=STDIO_PATH, help="CSV выходов (по умолчанию stdout)")
+    run.add_argument('--batch', type=int, default=DEFAULT_BATCH, help="трасс в одном пакете")
+    bench = subparsers.add_parser('bench', help="шагов в секунду на случайных трассах")
+    bench.add_argument('--sequences', type=int, default=10000)
+    bench.add_argument('--length', type=int, default=1000)
+    bench.add_argument('--chunk', type=int, help="шагов в блоке")
+    bench.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    try:
+        simulator = Simulator.from_file(args.machine)
+    except ImportError as error:
+        print(f"NumPy is required for batch simulation: {error}")
+        sys.exit(1)
+
+    if args.command == 'run':
+        run_traces(simulator, args.traces, args.output, args.batch)
+    else:
+        print(json.dumps(benchmark(simulator, args.sequences, args.length, args.chunk, args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()